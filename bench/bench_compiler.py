@@ -0,0 +1,81 @@
+from sqlalchemy import Column, Integer, MetaData, String, Table, bindparam, select
+from sqlalchemy import JSON
+
+from sqlalchemy_monetdb.bulk import monetdb_insert_values
+
+WIDE_COLUMNS = 800
+
+
+def wide_table(columns=WIDE_COLUMNS):
+    return Table(
+        "wide",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        *[Column("col_%d" % i, String(32)) for i in range(columns)]
+    )
+
+
+def test_compile_wide_select(benchmark, dialect):
+    table = wide_table()
+    stmt = select(table).where(table.c.id == 5, table.c.col_1 == "x")
+    benchmark(stmt.compile, dialect=dialect)
+
+
+def test_compile_wide_insert(benchmark, dialect):
+    # one bind parameter per column, each escaped and checked for quoting
+    benchmark(wide_table().insert().compile, dialect=dialect)
+
+
+def test_compile_wide_update(benchmark, dialect):
+    table = wide_table()
+    stmt = (
+        table.update()
+        .where(table.c.id == 5)
+        .values({column.name: "x" for column in table.c if column.name != "id"})
+    )
+    benchmark(stmt.compile, dialect=dialect)
+
+
+def test_compile_multi_values_insert(benchmark, dialect):
+    table = wide_table(columns=10)
+    rows = [
+        dict(id=i, **{"col_%d" % c: "value %d" % c for c in range(10)})
+        for i in range(1000)
+    ]
+    stmt = table.insert().values(rows)
+    benchmark(stmt.compile, dialect=dialect)
+
+
+def test_stream_insert_values(benchmark, catalog_engine):
+    # the same 1000 rows as above, rendered and executed in 64kB statements
+    table = wide_table(columns=10)
+    rows = [
+        dict(id=i, **{"col_%d" % c: "value %d" % c for c in range(10)})
+        for i in range(1000)
+    ]
+    engine = catalog_engine(tables=0, columns=0)
+
+    def run():
+        with engine.begin() as conn:
+            monetdb_insert_values(conn, table, rows, max_statement_bytes=65536)
+
+    benchmark(run)
+
+
+def test_bindparam_string_escaping(benchmark, dialect):
+    # reserved words, leading digits/underscores and characters MonetDB
+    # does not accept in parameter names all take the escaping paths
+    names = ["select", "_private", "1st", "a.b", "x[0]", "plain", "%pct", "Mixed Case"]
+    stmt = select(*[bindparam("%s_%d" % (n, i), i) for i in range(100) for n in names])
+    benchmark(stmt.compile, dialect=dialect)
+
+
+def test_json_path_bind_processing(benchmark, dialect):
+    process = JSON.JSONPathType().dialect_impl(dialect).bind_processor(dialect)
+    paths = [["a", i, "b", "c", i * 2] for i in range(1000)]
+
+    def run():
+        for path in paths:
+            process(path)
+
+    benchmark(run)
@@ -0,0 +1,13 @@
+from sqlalchemy import inspect
+
+
+def test_reflect_table_names(benchmark, catalog_engine):
+    engine = catalog_engine(tables=5000, columns=10)
+    with engine.connect() as conn:
+        benchmark(lambda: inspect(conn).get_table_names())
+
+
+def test_reflect_all_columns(benchmark, catalog_engine):
+    engine = catalog_engine(tables=2000, columns=20)
+    with engine.connect() as conn:
+        benchmark(lambda: inspect(conn).get_multi_columns())
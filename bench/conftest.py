@@ -0,0 +1,33 @@
+"""
+Fixtures for the benchmarks, which run without a MonetDB server.
+
+Reflection is benchmarked against the in-process fake DBAPI of
+:mod:`sqlalchemy_monetdb.fake`, serving a synthetic catalog.
+"""
+import pytest
+from sqlalchemy import create_engine
+
+from sqlalchemy_monetdb.dialect import MonetDialect
+from sqlalchemy_monetdb.fake import Catalog
+
+
+@pytest.fixture
+def dialect():
+    return MonetDialect()
+
+
+@pytest.fixture
+def catalog_engine():
+    """Return a factory of engines on a catalog of `tables` tables."""
+
+    def make(tables, columns):
+        catalog = Catalog()
+        spec = [
+            ("col_%d" % i, "int" if i % 2 else "varchar", 32)
+            for i in range(columns)
+        ]
+        for i in range(tables):
+            catalog.add_table("table_%d" % i, spec)
+        return create_engine("monetdb+fake://", catalog=catalog)
+
+    return make
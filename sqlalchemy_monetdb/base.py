@@ -1,7 +1,27 @@
-from sqlalchemy import schema
+import collections
+import datetime
+import math
+import numbers
+import re
+import time
+
+from sqlalchemy import exc, schema
+from sqlalchemy import pool
 from sqlalchemy import types as sql_types
 from sqlalchemy.engine import default
 from sqlalchemy.sql import compiler, operators
+from sqlalchemy.sql.expression import TextClause
+
+from sqlalchemy_monetdb.cache import ReplayCursor
+from sqlalchemy_monetdb.compiler import (
+    BIND_PARAMETER,
+    BoundedMemo,
+    ParameterTemplate,
+    encoded_size,
+    split_values,
+    sql_literal,
+)
+from sqlalchemy_monetdb.metrics import MeteredCursor
 
 RESERVED_WORDS = {
     "asc",
@@ -206,8 +226,526 @@ RESERVED_WORDS = {
 OPERATORS = compiler.OPERATORS
 OPERATORS[operators.ne] = " <> "
 
+# MonetDB aborts the loser of a write-write conflict, either at the
+# conflicting statement or at COMMIT
+CONCURRENCY_CONFLICT = re.compile(
+    r"concurrency conflicts?|transaction conflict detected", re.I
+)
+
+
+class ConcurrencyConflictError(exc.OperationalError):
+    """The transaction was aborted by MonetDB's optimistic concurrency control.
+
+    The transaction has been rolled back by the server and may be retried
+    as a whole, see :func:`sqlalchemy_monetdb.retry.run_transaction`.
+    """
+
+
+def quote(value):
+    value = value.replace("'", "''")
+    return "'" + value + "'"
+
+
+def is_concurrency_conflict(error):
+    """Return True if the DBAPI `error` reports a concurrency conflict."""
+    return CONCURRENCY_CONFLICT.search(str(error)) is not None
+
+
+# connection.info key of the table/sequence names loaded by
+# MonetDialect._catalog_snapshot
+CATALOG_SNAPSHOT = "monetdb_catalog_snapshot"
+
+
+# connection.info key of the session settings known to be in effect on the
+# DBAPI connection, so they are only sent to the server when they change
+SESSION_STATE = "monetdb_session_state"
+
+# textual statements changing a tracked session setting behind our back
+SESSION_SETTING = re.compile(
+    r"^\s*(?:SET\s+(SCHEMA|ROLE|TIME\s+ZONE|OPTIMIZER)\b"
+    r"|CALL\s+sys\.(setquerytimeout)\b)",
+    re.I,
+)
+
+# textual statements that may change the ids of schemas
+SCHEMA_DDL = re.compile(r"^\s*(?:CREATE|DROP|ALTER)\s+SCHEMA\b", re.I)
+
+# textual DDL, which may invalidate the plans of prepared statements
+TEXTUAL_DDL = re.compile(r"^\s*(?:CREATE|DROP|ALTER|COMMENT|GRANT|REVOKE)\b", re.I)
+
+_TIME_ZONE = re.compile(r"^([+-])(\d{1,2}):(\d{2})$")
+
+
+def time_zone_offset(value):
+    """Return the time zone `value` as a :class:`datetime.timedelta`.
+
+    `value` is a timedelta, a number of seconds east of UTC or a
+    ``"+HH:MM"`` string.
+    """
+    if value is None or isinstance(value, datetime.timedelta):
+        return value
+    if isinstance(value, str):
+        match = _TIME_ZONE.match(value.strip())
+        if match is None:
+            raise exc.ArgumentError(
+                "monetdb_time_zone must look like +HH:MM, got %r" % value
+            )
+        sign, hours, minutes = match.groups()
+        offset = datetime.timedelta(hours=int(hours), minutes=int(minutes))
+        return -offset if sign == "-" else offset
+    return datetime.timedelta(seconds=int(value))
+
+
+def query_timeout_seconds(value):
+    """Return the ``monetdb_query_timeout`` `value` in whole seconds.
+
+    ``sys.setquerytimeout`` takes seconds. Fractions are rounded up, so a
+    sub-second timeout doesn't become 0, which means no timeout at all.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, numbers.Real) or value < 0:
+        raise exc.ArgumentError(
+            "monetdb_query_timeout must be a non-negative number of seconds, "
+            "got %r" % (value,)
+        )
+    return math.ceil(value)
+
+
+def render_time_zone(offset):
+    """Render a time zone offset as a MonetDB interval literal."""
+    minutes = int(offset.total_seconds()) // 60
+    return "INTERVAL '%s%02d:%02d' HOUR TO MINUTE" % (
+        "-" if minutes < 0 else "+",
+        abs(minutes) // 60,
+        abs(minutes) % 60,
+    )
+
+
+def render_session_setting(preparer, name, value):
+    """Return the statement putting session setting `name` to `value`."""
+    if name == "query_timeout":
+        return "CALL sys.setquerytimeout(%d)" % value
+    if name == "optimizer":
+        return "SET optimizer = %s" % quote(value)
+    if name == "time_zone":
+        return "SET TIME ZONE %s" % render_time_zone(value)
+    # schema and role
+    return "SET %s %s" % (name.upper(), preparer.quote(value))
+
+
+def restore_session_settings(dialect, dbapi_connection, state):
+    """Put back the tracked session settings of `dbapi_connection`.
+
+    `state` is its ``SESSION_STATE``. Each setting goes back to the value
+    the session had when it was first tracked. Settings already at that
+    value cost nothing, settings changed by a textual statement are always
+    sent. Returns the number of statements sent.
+    """
+    names = [key[len("initial_"):] for key in state if key.startswith("initial_")]
+    statements = [
+        render_session_setting(
+            dialect.identifier_preparer, name, state["initial_" + name]
+        )
+        for name in names
+        if state.get(name) != state["initial_" + name]
+    ]
+    if statements:
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+    for name in names:
+        state[name] = state["default_" + name] = state["initial_" + name]
+    # defaults set for a checkout that never ran a statement
+    for key in [key for key in state if key.startswith("default_")]:
+        if "initial_" + key[len("default_"):] not in state:
+            del state[key]
+    return len(statements)
+
+
+# connection.info key of the server side prepared statements of the DBAPI
+# connection, an LRU of (schema, SQL text) to (statement id, parameter names)
+PREPARED_STATEMENTS = "monetdb_prepared_statements"
+
+def _bind_names(sql):
+    return [m.group(1) for m in BIND_PARAMETER.finditer(sql) if m.group(1)]
+
+
+def _fill(parts, limit):
+    """Group the ``(text, size)`` `parts` into lists of at most `limit` bytes.
+
+    A part larger than `limit` gets a list of its own.
+    """
+    chunks = [[]]
+    size = 0
+    for text, part_size in parts:
+        if chunks[-1] and size + part_size > limit:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(text)
+        size += part_size
+    return chunks
+
+
+def _chunk(statement, parameters):
+    return statement, {name: parameters[name] for name in _bind_names(statement)}
+
 
 class MonetExecutionContext(default.DefaultExecutionContext):
+    # key of the result in dialect.result_cache, see sqlalchemy_monetdb.cache
+    _cache_key = None
+
+    # (statement, parameters) executed in place of an oversized statement,
+    # see _split
+    chunks = None
+
+    def create_cursor(self):
+        cache = self.dialect.result_cache
+        if cache is not None:
+            self._cache_key = cache.key(self)
+            if self._cache_key is not None:
+                cursor = cache.get(self._cache_key)
+                if cursor is not None:
+                    return cursor
+        cursor = super(MonetExecutionContext, self).create_cursor()
+        if self.dialect.metrics is not None:
+            cursor = MeteredCursor(cursor, self.dialect.metrics)
+        return cursor
+
+    def post_exec(self):
+        if self._cache_key is not None and not isinstance(self.cursor, ReplayCursor):
+            self.cursor = self.dialect.result_cache.put(
+                self._cache_key,
+                self.compiled.statement,
+                self.cursor,
+                self.execution_options.get("schema_translate_map"),
+            )
+
+    def _connection_info(self):
+        """Return connection.info, None on a connection without one.
+
+        The ad-hoc connection DefaultDialect.initialize() runs on has no
+        info dictionary.
+        """
+        connection = self.root_connection.connection
+        if isinstance(connection, pool._AdhocProxiedConnection):
+            return None
+        return connection.info
+
+    def pre_exec(self):
+        if isinstance(self.cursor, ReplayCursor):
+            # a result of dialect.result_cache: no session settings, PREPARE
+            # or catalog bookkeeping for a statement that isn't sent
+            self.execute_started = time.perf_counter()
+            return
+
+        info = self._connection_info()
+        if info is None:
+            # nothing to track on the ad-hoc connection of initialize()
+            info = {}
+        elif not self.execution_options.get("monetdb_catalog_probe", False):
+            # anything but the snapshot query itself may change the catalog
+            info.pop(CATALOG_SNAPSHOT, None)
+
+        # EXPLAIN, PLAN or TRACE, see sqlalchemy_monetdb.explain
+        prefix = self.execution_options.get("monetdb_statement_prefix")
+        if prefix is not None:
+            self.statement = "%s %s" % (prefix, self.statement)
+        elif (
+            self.dialect.max_statement_size is not None
+            and self.compiled is not None
+            and not self.executemany
+            and not self.execution_options.get("monetdb_prepare", False)
+            and self.dialect.paramstyle == "named"
+        ):
+            self._split(self.dialect.max_statement_size)
+
+        if self.compiled is None or isinstance(self.compiled.statement, TextClause):
+            # no use putting back what the statement sets anyway
+            setting = self._forget_session_setting(info)
+            if SCHEMA_DDL.match(self.statement):
+                self.dialect.clear_schema_ids()
+            # DDL, or a SET SCHEMA changing what unqualified names resolve
+            # to, may invalidate the plans of prepared statements
+            changes_plans = setting not in (None, "query_timeout") or bool(
+                TEXTUAL_DDL.match(self.statement)
+            )
+        else:
+            if self.isddl:
+                self.dialect.clear_schema_ids()
+            changes_plans = self.isddl
+
+        # like the other options, the timeout is put back lazily, by the
+        # next statement that doesn't ask for it or on checkin
+        self._set_session_option(
+            info,
+            "query_timeout",
+            query_timeout_seconds(
+                self.execution_options.get("monetdb_query_timeout")
+            ),
+            self._current_query_timeout,
+        )
+        self._set_session_option(
+            info,
+            "optimizer",
+            self.execution_options.get("monetdb_optimizer"),
+            self._current_optimizer,
+        )
+        self._set_session_option(
+            info,
+            "schema",
+            self.execution_options.get("monetdb_schema"),
+            self._current_schema,
+        )
+        self._set_session_option(
+            info,
+            "role",
+            self.execution_options.get("monetdb_role"),
+            self._current_role,
+        )
+        self._set_session_option(
+            info,
+            "time_zone",
+            time_zone_offset(self.execution_options.get("monetdb_time_zone")),
+            self._current_time_zone,
+        )
+
+        if changes_plans:
+            if info.get(PREPARED_STATEMENTS):
+                self._session_call("DEALLOCATE PREPARE ALL")
+                info[PREPARED_STATEMENTS].clear()
+        elif (
+            self.execution_options.get("monetdb_prepare", False)
+            and self.compiled is not None
+            and prefix is None
+            and not self.executemany
+            and self.dialect.paramstyle == "named"
+        ):
+            self._exec_prepared(info)
+
+        # start of the execution proper, read by after_cursor_execute hooks
+        # such as sqlalchemy_monetdb.slowlog
+        self.execute_started = time.perf_counter()
+
+    def _side_cursor(self):
+        """Return a cursor for statements sent besides the statement itself."""
+        cursor = self._dbapi_connection.cursor()
+        if self.dialect.metrics is not None:
+            cursor = MeteredCursor(cursor, self.dialect.metrics)
+        return cursor
+
+    def _session_call(self, statement):
+        cursor = self._side_cursor()
+        try:
+            cursor.execute(statement)
+            return cursor.fetchall() if cursor.description else None
+        finally:
+            cursor.close()
+
+    def _exec_prepared(self, info):
+        """Execute the statement through a server side prepared statement.
+
+        Every distinct statement is prepared once per DBAPI connection, and
+        runs as ``EXEC id(...)`` afterwards, skipping the SQL parser and the
+        MAL optimizer. The least recently used statement is deallocated
+        when more than ``prepared_statement_cache_size`` are prepared, and
+        all of them after DDL or a textual ``SET`` of a session setting.
+        """
+        prepared = info.get(PREPARED_STATEMENTS)
+        if prepared is None:
+            prepared = info[PREPARED_STATEMENTS] = collections.OrderedDict()
+
+        # unqualified names resolve in the schema current at PREPARE time
+        key = (info.get(SESSION_STATE, {}).get("schema"), self.statement)
+        entry = prepared.get(key)
+        if entry is None:
+            template = self._parameter_template()
+            cursor = self._side_cursor()
+            try:
+                cursor.execute("PREPARE " + template.placeholders())
+                entry = prepared[key] = (cursor.lastrowid, template.names)
+            finally:
+                cursor.close()
+            while len(prepared) > self.dialect.prepared_statement_cache_size:
+                _, (evicted, _) = prepared.popitem(last=False)
+                self._session_call("DEALLOCATE PREPARE %d" % evicted)
+        else:
+            prepared.move_to_end(key)
+
+        statement_id, names = entry
+        parameters = self.parameters[0]
+        self.statement = "EXEC %d(%s)" % (
+            statement_id,
+            ", ".join(sql_literal(parameters[name]) for name in names),
+        )
+        self.parameters = [{}]
+
+    def _parameter_template(self):
+        if self.statement == self.compiled.string:
+            return self.compiled.parameter_template
+        if not self._expanded_parameters:
+            # schema translation, the same few SQL texts over and over
+            return self.compiled.translated_templates[self.statement]
+        # rendered at execution time, e.g. expanded IN
+        return ParameterTemplate(self.statement)
+
+    def _split(self, limit):
+        """Plan the statement as several of at most `limit` bytes.
+
+        A multi-row INSERT is split between its rows, a SELECT or DELETE
+        on the largest list of a top level ``IN`` criterion. The sizes
+        include the parameters pymonetdb appends to each statement.
+        """
+        parameters = self.parameters[0]
+
+        def cost(sql):
+            return encoded_size(sql) + sum(
+                encoded_size(name) + encoded_size(sql_literal(parameters[name])) + 2
+                for name in _bind_names(sql)
+            )
+
+        if self.compiled.isinsert:
+            values = self.compiled.values_rows
+            if values is None:
+                return
+            if self.statement != self.compiled.string:
+                # e.g. schema translation
+                values = split_values(self.statement)
+            head, rows, tail = values
+            parts = [(row, cost(row) + 2) for row in rows]
+            chunks = _fill(parts, limit - cost(head) - cost(tail))
+            if len(chunks) > 1:
+                self.chunks = [
+                    _chunk(head + ", ".join(chunk) + tail, parameters)
+                    for chunk in chunks
+                ]
+            return
+
+        expanded = [
+            names
+            for name, names in (self._expanded_parameters or {}).items()
+            if name in self.compiled.chunkable_in_parameters and len(names) > 1
+        ]
+        if not expanded:
+            return
+        names = max(expanded, key=len)
+        items = ", ".join(":" + name for name in names)
+        if self.statement.count(items) != 1:
+            return
+        # the same value in two chunks would return its rows twice
+        seen = set()
+        parts = []
+        for name in names:
+            value = parameters[name]
+            try:
+                if value in seen:
+                    continue
+            except TypeError:
+                return
+            seen.add(value)
+            parts.append((":" + name, cost(":" + name) + 2))
+        chunks = _fill(parts, limit - cost(self.statement) + cost(items))
+        if len(chunks) > 1:
+            self.chunks = [
+                _chunk(self.statement.replace(items, ", ".join(chunk)), parameters)
+                for chunk in chunks
+            ]
+
+    def execute_chunks(self, cursor):
+        """Execute the planned :attr:`chunks` on `cursor`.
+
+        Rows are concatenated into a :class:`.ReplayCursor`, rowcounts are
+        summed.
+        """
+        rowcount = 0
+        rows = []
+        description = None
+        for statement, parameters in self.chunks:
+            cursor.execute(statement, parameters)
+            if cursor.description is not None:
+                description = cursor.description
+                rows.extend(cursor.fetchall())
+            else:
+                rowcount += max(cursor.rowcount, 0)
+        if description is not None:
+            cursor.close()
+            self.cursor = ReplayCursor(description, rows)
+        else:
+            cursor.rowcount = rowcount
+
+    def _set_session_option(self, info, name, value, read_current):
+        """Put session option `name` to `value` for this statement.
+
+        The option is tracked per DBAPI connection and only sent when it
+        changes. It stays in effect until a statement without (or with a
+        different) value runs, which puts back the connection's default,
+        so consecutive statements sharing a value cost no extra round
+        trips. `value` None asks for the default. The default is the value
+        the session had, unless changed by a setter of
+        :mod:`sqlalchemy_monetdb.session` or a textual SET.
+
+        On checkin, :func:`restore_session_settings` puts back the values
+        the session had, and only for the options that differ.
+        """
+        state = info.get(SESSION_STATE)
+        if value is None and (state is None or "default_" + name not in state):
+            return
+        if state is None:
+            state = info[SESSION_STATE] = {}
+
+        if name not in state:
+            state[name] = read_current()
+            state.setdefault("default_" + name, state[name])
+            state.setdefault("initial_" + name, state[name])
+        if value is None:
+            value = state["default_" + name]
+        if value != state[name]:
+            self._session_call(
+                render_session_setting(self.dialect.identifier_preparer, name, value)
+            )
+            state[name] = value
+
+    def _forget_session_setting(self, info):
+        """Stop tracking a setting the statement changes itself.
+
+        Returns the name of the setting, None if the statement changes none.
+        """
+        match = SESSION_SETTING.match(self.statement)
+        if match is None:
+            return None
+        name = (match.group(1) or match.group(2)).lower()
+        name = {"setquerytimeout": "query_timeout"}.get(name, name)
+        name = "_".join(name.split())
+        state = info.get(SESSION_STATE)
+        if state:
+            # the new value becomes the one statements go back to, the
+            # initial one is still put back on checkin
+            state.pop(name, None)
+            state.pop("default_" + name, None)
+        return name
+
+    def _current_schema(self):
+        return self._session_call("SELECT current_schema")[0][0]
+
+    def _current_role(self):
+        return self._session_call("SELECT current_role")[0][0]
+
+    def _current_time_zone(self):
+        return time_zone_offset(self._session_call("SELECT current_timezone")[0][0])
+
+    def _current_query_timeout(self):
+        rows = self._session_call(
+            "SELECT querytimeout FROM sys.sessions "
+            "WHERE sessionid = sys.current_sessionid()"
+        )
+        return rows[0][0] if rows else 0
+
+    def _current_optimizer(self):
+        return self._session_call("SELECT optimizer")[0][0]
+
     def get_column_default(self, column, isinsert=True):
         if column.primary_key:
             # pre-execute passive defaults on primary keys
@@ -243,9 +781,13 @@ class MonetIdentifierPreparer(compiler.IdentifierPreparer):
         super(MonetIdentifierPreparer, self).__init__(*args, **kwargs)
 
         self._double_percents = False
+        self._bindparam_quoting = BoundedMemo(self._compute_bindparam_quoting)
 
     def _bindparam_requires_quotes(self, value):
         """Return True if the given identifier requires quoting."""
+        return self._bindparam_quoting[value]
+
+    def _compute_bindparam_quoting(self, value):
         lc_value = value.lower()
         if value[0] == '"' and value[-1] == '"':
             return False
@@ -0,0 +1,96 @@
+"""
+Streaming multi-row INSERT for very large batches.
+
+``table.insert().values(rows)`` compiles every row into one statement, so
+the rows, their SQL fragments and the statement all live in memory at
+once. :func:`monetdb_insert_values` renders the rows one at a time into
+``INSERT INTO ... VALUES (...), (...)`` statements of at most
+`max_statement_bytes`, by default the engine's ``max_statement_size`` or
+1 MB, and executes each as soon as it is full::
+
+    from sqlalchemy_monetdb.bulk import monetdb_insert_values
+
+    with engine.begin() as conn:
+        rows = ({"id": i, "name": name} for i, name in enumerate(names))
+        inserted = monetdb_insert_values(conn, users, rows)
+
+`rows` may be any iterable, e.g. a generator reading a file, and is only
+consumed as far as the current statement needs. Values go through the
+bind processing of their column types and are inlined as literals.
+"""
+import io
+import itertools
+
+from sqlalchemy import exc
+
+from sqlalchemy_monetdb.compiler import encoded_size, sql_literal
+
+# size of each INSERT statement unless told otherwise
+MAX_STATEMENT_BYTES = 1024 * 1024
+
+
+def monetdb_insert_values(connection, table, rows, max_statement_bytes=None):
+    """INSERT the `rows` dicts into `table`, return the number inserted.
+
+    The columns are those of the first row, every row must have values for
+    them. A single row larger than `max_statement_bytes` is sent in a
+    statement of its own.
+    """
+    dialect = connection.dialect
+    preparer = dialect.identifier_preparer
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    columns = [column for column in table.c if column.key in first]
+    if len(columns) != len(first):
+        raise exc.ArgumentError(
+            "Unconsumed column names: %s"
+            % ", ".join(sorted(set(first).difference(table.c.keys())))
+        )
+    processors = [
+        (column.key, column.type._cached_bind_processor(dialect))
+        for column in columns
+    ]
+    prefix = "INSERT INTO %s (%s) VALUES " % (
+        preparer.format_table(table),
+        ", ".join(preparer.format_column(column) for column in columns),
+    )
+    if max_statement_bytes is None:
+        max_statement_bytes = dialect.max_statement_size or MAX_STATEMENT_BYTES
+    limit = max_statement_bytes - encoded_size(prefix)
+
+    buffer = io.StringIO()
+    size = count = 0
+
+    def flush():
+        result = connection.exec_driver_sql(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+        return result.rowcount
+
+    for number, row in enumerate(itertools.chain([first], rows)):
+        values = []
+        for key, process in processors:
+            try:
+                value = row[key]
+            except KeyError as err:
+                raise exc.ArgumentError(
+                    "row %d has no value for column %r" % (number, key)
+                ) from err
+            values.append(sql_literal(process(value) if process else value))
+        fragment = "(%s)" % ", ".join(values)
+        fragment_size = encoded_size(fragment)
+        if size and size + 2 + fragment_size > limit:
+            count += flush()
+            size = 0
+        if size:
+            buffer.write(", ")
+            size += 2
+        else:
+            buffer.write(prefix)
+        buffer.write(fragment)
+        size += fragment_size
+    if size:
+        count += flush()
+    return count
@@ -0,0 +1,272 @@
+"""
+Client side cache of SELECT results.
+
+The cache is installed on an engine and only used by statements executed
+with the ``monetdb_cache`` execution option::
+
+    from sqlalchemy_monetdb.cache import ResultCache
+
+    cache = ResultCache(max_entries=500, ttl=60)
+    cache.install(engine)
+
+    with engine.connect() as conn:
+        stmt = select(sales.c.region, func.sum(sales.c.amount)).group_by(
+            sales.c.region
+        )
+        rows = conn.execute(stmt.execution_options(monetdb_cache=True)).all()
+
+Results are keyed by the compiled SQL and its parameters, and dropped
+after `ttl` seconds, when the least recently used entry makes room, or as
+soon as an INSERT, UPDATE or DELETE through the same engine touches one of
+the tables the SELECT reads. A connection that changed a table and has
+not committed yet neither reads nor stores results of that table, so the
+cache never holds uncommitted rows. Changes made by other clients are only
+seen once an entry expires. Textual SQL is never cached, as the tables it reads
+are unknown, and textual DML or DDL empties the whole cache; other textual
+statements, such as SET or SAVEPOINT, leave it alone.
+"""
+import collections
+import re
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.expression import TableClause
+
+# connection.info key of the tables changed by the current transaction
+DIRTY_TABLES = "monetdb_cache_dirty_tables"
+
+
+# textual statements that may write, DDL included
+WRITE_STATEMENT = re.compile(
+    r"^\s*(?:INSERT|UPDATE|DELETE|MERGE|TRUNCATE|COPY|CREATE|DROP|ALTER|CALL)\b",
+    re.I,
+)
+
+
+def referenced_tables(statement, schema_translate_map=None):
+    """Return the ``(schema, name)`` of the tables and views `statement`
+    refers to, schema None for unqualified names."""
+    translate = schema_translate_map or {}
+    return frozenset(
+        (translate.get(element.schema, element.schema), element.name)
+        for element in visitors.iterate(statement)
+        if isinstance(element, TableClause)
+    )
+
+
+def _overlap(tables, changed):
+    """Whether any of `tables` may be one of the `changed` tables.
+
+    Both hold ``(schema, name)`` pairs, schema None for unqualified names;
+    None in `changed` stands for unknown tables.
+    """
+    if None in changed:
+        return True
+    return any(
+        name == changed_name
+        and (schema is None or changed_schema in (schema, None))
+        for schema, name in tables
+        for changed_schema, changed_name in changed
+    )
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class ReplayCursor(object):
+    """DBAPI cursor stand-in returning rows read earlier."""
+
+    arraysize = 1
+    lastrowid = None
+
+    def __init__(self, description, rows):
+        self.description = description
+        self.rowcount = len(rows)
+        self._rows = rows
+        self._position = 0
+
+    def execute(self, operation, parameters=None):
+        pass
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._rows[self._position - 1]
+
+    def fetchmany(self, size=None):
+        start = self._position
+        self._position = min(start + (size or self.arraysize), len(self._rows))
+        return self._rows[start:self._position]
+
+    def fetchall(self):
+        start, self._position = self._position, len(self._rows)
+        return self._rows[start:]
+
+    def close(self):
+        pass
+
+
+class ResultCache(object):
+    """A size and time bounded LRU of SELECT results.
+
+    max_entries
+      the number of results kept
+
+    ttl
+      seconds a result stays valid, None to keep it until evicted or
+      invalidated
+    """
+
+    def __init__(self, max_entries=1000, ttl=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._by_table = collections.defaultdict(set)
+
+    def install(self, engine):
+        engine.dialect.result_cache = self
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "commit", self._end_transaction)
+        event.listen(engine, "rollback", self._end_transaction)
+
+    def remove(self, engine):
+        engine.dialect.result_cache = None
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.remove(engine, "commit", self._end_transaction)
+        event.remove(engine, "rollback", self._end_transaction)
+
+    def key(self, context):
+        """Return the cache key of an execution, or None if not cacheable."""
+        compiled = context.compiled
+        if (
+            compiled is None
+            or not context.execution_options.get("monetdb_cache", False)
+            or not compiled.statement.is_select
+            or len(context.compiled_parameters) != 1
+        ):
+            return None
+        parameters = context.compiled_parameters[0]
+        options = context.execution_options
+        info = context._connection_info()
+        if info and info.get(DIRTY_TABLES) and _overlap(
+            referenced_tables(compiled.statement, options.get("schema_translate_map")),
+            info[DIRTY_TABLES],
+        ):
+            # the connection would read, or store, its uncommitted changes
+            return None
+        key = (
+            options.get("monetdb_statement_prefix"),
+            # compiled.string leaves the schema translation to execution
+            frozenset(options.get("schema_translate_map", {}).items())
+            if compiled.schema_translate_map
+            else None,
+            # the session settings unqualified names and times depend on
+            options.get("monetdb_schema"),
+            options.get("monetdb_role"),
+            options.get("monetdb_time_zone"),
+            compiled.string,
+            tuple(sorted((k, _freeze(v)) for k, v in parameters.items())),
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, key):
+        """Return a :class:`ReplayCursor` over the result cached for `key`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry[0] is None or entry[0] > self._clock()
+            ):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return ReplayCursor(entry[2], entry[3])
+            if entry is not None:
+                self._discard(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, statement, cursor, schema_translate_map=None):
+        """Read all rows of `cursor`, cache them and return a :class:`ReplayCursor`."""
+        description = cursor.description
+        rows = cursor.fetchall() if description is not None else []
+        cursor.close()
+        tables = referenced_tables(statement, schema_translate_map)
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            if tables:
+                self._discard(key)
+                self._entries[key] = (expires, tables, description, rows)
+                for table in tables:
+                    self._by_table[table].add(key)
+                while len(self._entries) > self.max_entries:
+                    self._discard(next(iter(self._entries)))
+        return ReplayCursor(description, rows)
+
+    def invalidate(self, tables=None):
+        """Drop the results reading any of `tables`, or all results.
+
+        `tables` holds ``(schema, name)`` pairs. An unqualified name may
+        be in any schema, so it matches the name in every schema, and a
+        qualified name also matches the unqualified one.
+        """
+        with self._lock:
+            if tables is None:
+                self._entries.clear()
+                self._by_table.clear()
+                return
+            for schema, name in tables:
+                for table in list(self._by_table):
+                    if table[1] == name and (
+                        schema is None or table[0] in (schema, None)
+                    ):
+                        for key in list(self._by_table.get(table, ())):
+                            self._discard(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[1]:
+            keys = self._by_table[table]
+            keys.discard(key)
+            if not keys:
+                del self._by_table[table]
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        compiled = context.compiled
+        if compiled is not None and compiled.statement.is_select:
+            return
+        if compiled is not None and compiled.statement.is_dml:
+            tables = referenced_tables(
+                compiled.statement.table,
+                context.execution_options.get("schema_translate_map"),
+            )
+        elif WRITE_STATEMENT.match(statement):
+            # textual DML or DDL, writing to unknown tables
+            tables = None
+        else:
+            # e.g. a textual SELECT, SET or SAVEPOINT
+            return
+        self.invalidate(tables)
+        # uncommitted changes may have been cached meanwhile
+        dirty = conn.info.setdefault(DIRTY_TABLES, set())
+        dirty.update(tables if tables is not None else [None])
+
+    def _end_transaction(self, conn):
+        dirty = conn.info.pop(DIRTY_TABLES, None)
+        if dirty:
+            self.invalidate(None if None in dirty else dirty)
@@ -0,0 +1,104 @@
+"""
+Stop statements that are still running on the server.
+
+Abandoning a query client side, because the HTTP client went away or the
+awaiting task was cancelled, does not stop MonetDB from executing it.
+:func:`cancel_query` finds the running statement in ``sys.queue()`` by the
+server session id of the connection, and stops it from a separate
+connection. The session id is queried once per DBAPI connection, and that
+has to happen while the connection is idle::
+
+    # in the thread running the statement
+    engine.dialect.get_session_id(connection.connection.dbapi_connection)
+    connection.execute(stmt)
+
+    # from another thread
+    cancel_query(engine, busy_connection)
+
+    # from asyncio, the statement runs in a worker thread
+    rows = await run_cancellable(
+        engine, lambda conn: conn.execute(stmt).fetchall()
+    )
+"""
+import asyncio
+
+from sqlalchemy import exc
+
+
+def _dbapi_connection(connection):
+    # accept a Connection, a pool connection or a DBAPI connection
+    connection = getattr(connection, "connection", connection)
+    return getattr(connection, "dbapi_connection", connection)
+
+
+def cancel_query(engine, connection):
+    """Stop the statement running on `connection` and return the number of
+    statements stopped.
+
+    The statement is looked up and stopped over a new DBAPI connection,
+    as `connection` itself is busy. It is opened the way the engine opens
+    its connections, with the same `connect_args`, `creator` and connect
+    events. The stopped statement fails with a server error in the thread
+    that executes it.
+    """
+    session_id = engine.dialect.get_session_id(
+        _dbapi_connection(connection), query=False
+    )
+    if session_id is None:
+        raise exc.InvalidRequestError(
+            "The MonetDB session id of this connection is unknown; call "
+            "dialect.get_session_id() on it before it runs the statement"
+        )
+
+    # a pool of its own, so an exhausted pool doesn't block the cancel
+    side_pool = engine.pool.recreate()
+    side_connection = side_pool.connect()
+    try:
+        side_connection.dbapi_connection.set_autocommit(True)
+        cursor = side_connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT tag FROM sys.queue() "
+                "WHERE sessionid = %d AND status = 'running'" % session_id
+            )
+            tags = [row[0] for row in cursor.fetchall()]
+            for tag in tags:
+                cursor.execute("CALL sys.stop(%d)" % tag)
+        finally:
+            cursor.close()
+    finally:
+        side_connection.close()
+        side_pool.dispose()
+    return len(tags)
+
+
+async def run_cancellable(engine, fn):
+    """Run ``fn(connection)`` in a worker thread and return its result.
+
+    If the awaiting task is cancelled while `fn` runs, the statement it is
+    executing is stopped with :func:`cancel_query` before the
+    :class:`asyncio.CancelledError` propagates.
+    """
+    loop = asyncio.get_running_loop()
+    running = {}
+
+    def work():
+        with engine.connect() as connection:
+            # known before anything runs, for cancel_query
+            engine.dialect.get_session_id(_dbapi_connection(connection))
+            running["connection"] = connection
+            try:
+                return fn(connection)
+            finally:
+                del running["connection"]
+
+    future = loop.run_in_executor(None, work)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # the stopped statement fails in the worker; nobody awaits that error
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        connection = running.get("connection")
+        if connection is not None:
+            await loop.run_in_executor(None, cancel_query, engine, connection)
+        raise
@@ -0,0 +1,68 @@
+"""
+Columnar result retrieval for the embedded ``monetdb+monetdbe`` dialect.
+
+monetdbe hands out query results as NumPy arrays; numeric columns are
+views on the engine's own column buffers, so no row tuples are built::
+
+    from sqlalchemy_monetdb.columnar import monetdb_columns
+
+    with engine.connect() as conn:
+        columns = monetdb_columns(conn.execute(stmt))
+        columns["amount"].mean()
+
+Each column is a :class:`numpy.ma.MaskedArray` with NULLs masked.
+"""
+import numpy
+
+from sqlalchemy import exc
+
+from sqlalchemy_monetdb import monetdb_types as types
+from sqlalchemy_monetdb.monetdb_types import MONETDB_TYPE_MAP
+
+# monetdbe names result columns after the C type carrying them
+_TYPE_CODES = {"float": "double", "string": "clob"}
+
+_NUMPY_TYPES = {
+    types.BOOLEAN: numpy.bool_,
+    types.TINYINT: numpy.int8,
+    types.SMALLINT: numpy.int16,
+    types.INTEGER: numpy.int32,
+    types.BIGINT: numpy.int64,
+    types.FLOAT: numpy.float32,
+    types.DOUBLE_PRECISION: numpy.float64,
+    types.DATE: "datetime64[D]",
+    types.TIMESTAMP: "datetime64[ms]",
+}
+
+
+def monetdb_type(type_code):
+    """Return the SQLAlchemy type class of a monetdbe result column."""
+    return MONETDB_TYPE_MAP.get(_TYPE_CODES.get(type_code, type_code))
+
+
+def monetdb_columns(result):
+    """Return the rows of `result` as a dict of column name to masked array.
+
+    `result` must not have been fetched from yet, and is closed afterwards.
+    Numeric columns keep sharing memory with the engine.
+    """
+    cursor = result.cursor
+    if cursor is None or not hasattr(cursor, "fetchnumpy"):
+        raise exc.InvalidRequestError(
+            "monetdb_columns() needs a result of a monetdb+monetdbe connection"
+        )
+    try:
+        arrays = cursor.fetchnumpy()
+        description = cursor.description
+    finally:
+        result.close()
+
+    columns = {}
+    for entry in description:
+        name, type_code = entry[0], entry[1]
+        column = numpy.ma.asarray(arrays[name])
+        dtype = _NUMPY_TYPES.get(monetdb_type(type_code))
+        if dtype is not None and column.dtype != dtype:
+            column = column.astype(dtype)
+        columns[name] = column
+    return columns
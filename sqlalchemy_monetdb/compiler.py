@@ -1,8 +1,110 @@
 # import pdb
-from sqlalchemy import types as sqltypes, schema, util
+from pymonetdb.sql import monetize
+from sqlalchemy import types as sqltypes, schema, util, exc
 from sqlalchemy.sql import compiler, operators, cast
+from sqlalchemy.sql import elements, functions, selectable, visitors
 
 import re
+import time
+
+# a bound parameter of the named paramstyle, outside of string literals
+# and quoted identifiers
+BIND_PARAMETER = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|:(\w+|"[^"]+")""")
+
+
+def _escape(value):
+    return "'%s'" % value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+# SQL literal formatters by exact Python type, as pymonetdb renders them
+_LITERALS = dict(monetize.mapping_dict)
+_LITERALS.update({str: _escape, int: int.__repr__, float: float.__repr__})
+
+
+def sql_literal(value):
+    """Render `value` as a MonetDB SQL literal."""
+    formatter = _LITERALS.get(type(value))
+    if formatter is None:
+        return monetize.convert(value)
+    return formatter(value)
+
+
+class ParameterTemplate(object):
+    """SQL text of the named paramstyle split around its bound parameters.
+
+    `fragments` holds the SQL between the parameters, one more than the
+    parameter `names`.
+    """
+
+    __slots__ = ("fragments", "names")
+
+    def __init__(self, statement):
+        self.fragments = fragments = []
+        self.names = names = []
+        last = 0
+        for match in BIND_PARAMETER.finditer(statement):
+            if match.group(1) is not None:
+                fragments.append(statement[last:match.start()])
+                names.append(match.group(1))
+                last = match.end()
+        fragments.append(statement[last:])
+
+    def placeholders(self):
+        """Return the SQL with ? markers, as used by PREPARE."""
+        return "?".join(self.fragments)
+
+
+def encoded_size(text):
+    """Return the length of `text` in UTF-8 bytes."""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+# string literals, quoted identifiers and the parentheses and commas
+# between them
+_VALUES_TOKEN = re.compile(r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"]|"")*"|[(),]""")
+
+
+def split_values(statement):
+    """Split a multi-row INSERT into its rows.
+
+    Returns the SQL before the first row, the ``(...)`` row tuples and the
+    SQL after the last row.
+    """
+    depth = 0
+    bounds = []
+    for match in _VALUES_TOKEN.finditer(statement):
+        token = match.group(0)
+        if token == "(":
+            if depth == 0:
+                start = match.start()
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth == 0:
+                bounds.append((start, match.end()))
+    # the first group is the column list
+    bounds = bounds[1:]
+    return (
+        statement[: bounds[0][0]],
+        [statement[start:end] for start, end in bounds],
+        statement[bounds[-1][1]:],
+    )
+
+
+class BoundedMemo(dict):
+    """Values of `function` by argument, emptied once `size` are held."""
+
+    def __init__(self, function, size=10000):
+        super(BoundedMemo, self).__init__()
+        self.function = function
+        self.size = size
+
+    def __missing__(self, key):
+        if len(self) >= self.size:
+            self.clear()
+        value = self[key] = self.function(key)
+        return value
+
 
 FK_ON_DELETE = re.compile(
     r"^(?:RESTRICT|CASCADE|SET NULL|NO ACTION|SET DEFAULT)$", re.I
@@ -13,14 +115,85 @@ FK_ON_UPDATE = re.compile(
 
 
 class MonetDDLCompiler(compiler.DDLCompiler):
+    def visit_create_table(self, create, **kw):
+        text = super(MonetDDLCompiler, self).visit_create_table(create, **kw)
+        kind = self._table_kind(create.element)
+        if kind is not None:
+            text = text.replace("CREATE ", "CREATE %s " % kind, 1)
+        return text
+
+    def _table_kind(self, table):
+        opts = table.dialect_options["monetdb"]
+        kinds = [
+            kind
+            for kind, enabled in (
+                ("MERGE", opts["merge"]),
+                ("REPLICA", opts["replica"]),
+                ("UNLOGGED", opts["unlogged"]),
+                ("REMOTE", opts["remote"] is not None),
+            )
+            if enabled
+        ]
+        if len(kinds) > 1:
+            raise exc.CompileError(
+                "Table %s can only be one of %s"
+                % (table.name, " or ".join("%s TABLE" % k for k in kinds))
+            )
+        return kinds[0] if kinds else None
+
+    def post_create_table(self, table):
+        opts = table.dialect_options["monetdb"]
+        if opts["remote"] is None:
+            return ""
+
+        def literal(value):
+            return self.sql_compiler.render_literal_value(value, sqltypes.STRINGTYPE)
+
+        text = " ON %s" % literal(opts["remote"])
+        if opts["remote_user"] is not None or opts["remote_password"] is not None:
+            text += " WITH"
+            if opts["remote_user"] is not None:
+                text += " USER %s" % literal(opts["remote_user"])
+            if opts["remote_password"] is not None:
+                text += " PASSWORD %s" % literal(opts["remote_password"])
+        return text
+
+    def visit_alter_table_add_table(self, alter, **kw):
+        return "ALTER TABLE %s ADD TABLE %s" % (
+            self.preparer.format_table(alter.element),
+            self.preparer.format_table(alter.member),
+        )
+
+    def visit_alter_table_drop_table(self, alter, **kw):
+        return "ALTER TABLE %s DROP TABLE %s" % (
+            self.preparer.format_table(alter.element),
+            self.preparer.format_table(alter.member),
+        )
+
     def visit_create_sequence(self, create, **kwargs):
-        text = "CREATE SEQUENCE %s AS INTEGER" % self.preparer.format_sequence(
-            create.element
+        seq = create.element
+        text = "CREATE SEQUENCE %s AS %s" % (
+            self.preparer.format_sequence(seq),
+            self.type_compiler.process(seq.data_type)
+            if seq.data_type is not None
+            else "INTEGER",
         )
-        if create.element.start is not None:
-            text += " START WITH %d" % create.element.start
-        if create.element.increment is not None:
-            text += " INCREMENT BY %d" % create.element.increment
+        if seq.start is not None:
+            text += " START WITH %d" % seq.start
+        if seq.increment is not None:
+            text += " INCREMENT BY %d" % seq.increment
+        if seq.minvalue is not None:
+            text += " MINVALUE %d" % seq.minvalue
+        elif seq.nominvalue:
+            text += " NO MINVALUE"
+        if seq.maxvalue is not None:
+            text += " MAXVALUE %d" % seq.maxvalue
+        elif seq.nomaxvalue:
+            text += " NO MAXVALUE"
+        if seq.cache is not None:
+            text += " CACHE %d" % seq.cache
+        if seq.cycle is not None:
+            text += " CYCLE" if seq.cycle else " NO CYCLE"
         return text
 
     def visit_drop_sequence(self, drop, **kwargs):
@@ -172,6 +345,81 @@ class MonetCompiler(compiler.SQLCompiler):
         }
     )
 
+    def __init_subclass__(cls, **kw):
+        super(MonetCompiler, cls).__init_subclass__(**kw)
+        cls._escaped_bind_names = BoundedMemo(cls._escape_bind_name)
+
+    def __init__(self, dialect, statement, *args, **kwargs):
+        if dialect.metrics is None:
+            super(MonetCompiler, self).__init__(dialect, statement, *args, **kwargs)
+            return
+        started = time.perf_counter()
+        super(MonetCompiler, self).__init__(dialect, statement, *args, **kwargs)
+        dialect.metrics.add("compile_seconds", time.perf_counter() - started)
+
+    @util.memoized_property
+    def parameter_template(self):
+        """The :class:`ParameterTemplate` of the compiled SQL."""
+        return ParameterTemplate(self.string)
+
+    @util.memoized_property
+    def translated_templates(self):
+        """:class:`ParameterTemplate` by SQL after schema translation."""
+        return BoundedMemo(ParameterTemplate, size=1000)
+
+    @util.memoized_property
+    def values_rows(self):
+        """:func:`split_values` of a multi-row INSERT, else None."""
+        if self.isinsert and self.compile_state._has_multi_parameters:
+            return split_values(self.string)
+        return None
+
+    @util.memoized_property
+    def chunkable_in_parameters(self):
+        """Names of the expanding IN parameters the statement may be split on.
+
+        Those are the parameters of ``IN`` criteria ANDed into the WHERE
+        clause of a DELETE, or of a SELECT whose rows can simply be
+        concatenated: one without aggregation, ordering, limits or DISTINCT.
+        """
+        statement = self.statement
+        if isinstance(statement, selectable.Select):
+            if (
+                statement._group_by_clauses
+                or statement._having_criteria
+                or statement._order_by_clauses
+                or statement._limit_clause is not None
+                or statement._offset_clause is not None
+                or statement._fetch_clause is not None
+                or statement._distinct
+                or any(
+                    isinstance(element, (functions.FunctionElement, elements.Over))
+                    for column in statement.selected_columns
+                    for element in visitors.iterate(column)
+                )
+            ):
+                return frozenset()
+        elif not self.isdelete:
+            return frozenset()
+
+        names = set()
+        criteria = list(statement._where_criteria)
+        while criteria:
+            criterion = criteria.pop()
+            if isinstance(criterion, elements.BooleanClauseList):
+                if criterion.operator is operators.and_:
+                    criteria.extend(criterion.clauses)
+            elif (
+                isinstance(criterion, elements.BinaryExpression)
+                and criterion.operator is operators.in_op
+                and isinstance(criterion.right, elements.BindParameter)
+                and criterion.right.expanding
+                and not criterion.right.type._is_tuple_type
+                and criterion.right in self.bind_names
+            ):
+                names.add(self.bind_names[criterion.right])
+        return frozenset(names)
+
     def bindparam_string(self, name, **kw):
         if self.preparer._bindparam_requires_quotes(name) and not kw.get(
             "post_compile", False
@@ -186,22 +434,28 @@ class MonetCompiler(compiler.SQLCompiler):
 
         escaped_from = kw.get("escaped_from", None)
         if not escaped_from:
-            if self._bind_translate_re.search(name):
-                new_name = self._bind_translate_re.sub(
-                    lambda m: self._bind_translate_chars[m.group(0)],
-                    name,
-                )
-                if new_name[0].isdigit() or new_name[0] == "_" or new_name[0] == "%":
-                    new_name = "D" + new_name
-                kw["escaped_from"] = name
-                name = new_name
-            elif name[0].isdigit() or name[0] == "_" or name[0] == "%":
-                new_name = "D" + name
+            new_name = self._escaped_bind_names[name]
+            if new_name is not None:
                 kw["escaped_from"] = name
                 name = new_name
 
         return compiler.SQLCompiler.bindparam_string(self, name, **kw)
 
+    @classmethod
+    def _escape_bind_name(cls, name):
+        """Return `name` made a legal parameter name, None if it is one."""
+        if cls._bind_translate_re.search(name):
+            new_name = cls._bind_translate_re.sub(
+                lambda m: cls._bind_translate_chars[m.group(0)],
+                name,
+            )
+            if new_name[0].isdigit() or new_name[0] == "_" or new_name[0] == "%":
+                new_name = "D" + new_name
+            return new_name
+        elif name[0].isdigit() or name[0] == "_" or name[0] == "%":
+            return "D" + name
+        return None
+
     def visit_mod(self, binary, **kw):
         return self.process(binary.left) + " %% " + self.process(binary.right)
 
@@ -356,3 +610,8 @@ class MonetCompiler(compiler.SQLCompiler):
 
     def visit_json_path_getitem_op_binary(self, binary, operator, _cast_applied=False, **kw):
         return self._render_json_extract_from_binary(binary, operator, _cast_applied, **kw)
+
+
+# escaped bind names by original name, one memo per compiler class as
+# subclasses may escape other characters, see __init_subclass__
+MonetCompiler._escaped_bind_names = BoundedMemo(MonetCompiler._escape_bind_name)
@@ -0,0 +1,35 @@
+from sqlalchemy.sql.ddl import _CreateDropBase
+
+
+class AlterTableAddTable(_CreateDropBase):
+    """Add `member` to the merge or replica table `table`.
+
+    Renders ``ALTER TABLE <table> ADD TABLE <member>``. The member of a
+    merge table may be a remote table, which makes the merge table fan its
+    queries out over the nodes holding the partitions::
+
+        event.listen(
+            metadata,
+            "after_create",
+            AlterTableAddTable(merged, part).execute_if(dialect="monetdb"),
+        )
+    """
+
+    __visit_name__ = "alter_table_add_table"
+
+    def __init__(self, table, member):
+        super(AlterTableAddTable, self).__init__(table)
+        self.member = member
+
+
+class AlterTableDropTable(_CreateDropBase):
+    """Remove `member` from the merge or replica table `table`.
+
+    Renders ``ALTER TABLE <table> DROP TABLE <member>``.
+    """
+
+    __visit_name__ = "alter_table_drop_table"
+
+    def __init__(self, table, member):
+        super(AlterTableDropTable, self).__init__(table)
+        self.member = member
@@ -1,6 +1,7 @@
 import json
 import re
 import typing
+import weakref
 from typing import Optional, List, Any
 from collections import defaultdict
 
@@ -9,12 +10,22 @@ from sqlalchemy import text
 # from sqlalchemy import sql, util
 # from sqlalchemy import types as sqltypes
 
-from sqlalchemy import pool, exc
+from sqlalchemy import event, pool, exc
+from sqlalchemy import schema as sa_schema
 from sqlalchemy.engine import default, reflection, ObjectScope, ObjectKind
 from sqlalchemy.engine.interfaces import ReflectedCheckConstraint
 from sqlalchemy.sql import sqltypes
 
-from sqlalchemy_monetdb.base import MonetExecutionContext, MonetIdentifierPreparer
+from sqlalchemy_monetdb.base import (
+    CATALOG_SNAPSHOT,
+    ConcurrencyConflictError,
+    MonetExecutionContext,
+    MonetIdentifierPreparer,
+    SESSION_STATE,
+    is_concurrency_conflict,
+    quote,
+    restore_session_settings,
+)
 from sqlalchemy_monetdb.compiler import (
     MonetDDLCompiler,
     MonetTypeCompiler,
@@ -38,13 +49,20 @@ except ImportError:
     pass
 
 
-def quote(value):
-    value = value.replace("'", "''")
-    return "'" + value + "'"
+# ids from sys.table_types
+TABLE = 0
+VIEW = 1
+MERGE_TABLE = 3
+REMOTE_TABLE = 5
+REPLICA_TABLE = 6
+UNLOGGED_TABLE = 7
+
+# every kind of persistent table that is reflected as a Table
+TABLE_TYPES = [TABLE, MERGE_TABLE, REMOTE_TABLE, REPLICA_TABLE, UNLOGGED_TABLE]
 
 
 class MonetDialect(default.DefaultDialect):
-    supports_statement_cache = False
+    supports_statement_cache = True
     name = "monetdb"
     driver = "pymonetdb"
 
@@ -69,14 +87,52 @@ class MonetDialect(default.DefaultDialect):
     type_compiler = MonetTypeCompiler
     default_paramstyle = "named"
 
+    # sqlalchemy_monetdb.metrics.DialectMetrics, see install_metrics()
+    metrics = None
+
+    # sqlalchemy_monetdb.cache.ResultCache, see ResultCache.install()
+    result_cache = None
+
     colspecs =  {
                     sqltypes.JSON.JSONPathType: JSONPathType,
                 }
 
-    def __init__(self, json_serializer=None, json_deserializer=None, **kwargs):
+    construct_arguments = [
+        (
+            sa_schema.Table,
+            {
+                "merge": False,
+                "replica": False,
+                "unlogged": False,
+                "remote": None,
+                "remote_user": None,
+                "remote_password": None,
+            },
+        ),
+    ]
+
+    def __init__(
+        self,
+        json_serializer=None,
+        json_deserializer=None,
+        optimizer=None,
+        prepared_statement_cache_size=100,
+        max_statement_size=None,
+        **kwargs
+    ):
         default.DefaultDialect.__init__(self, **kwargs)
         self._json_serializer = json_serializer
         self._json_deserializer = json_deserializer
+        self._session_ids = weakref.WeakKeyDictionary()
+        # optimizer pipeline set on every new connection, e.g. "sequential_pipe"
+        self.optimizer = optimizer
+        # statements kept prepared per connection with monetdb_prepare
+        self.prepared_statement_cache_size = prepared_statement_cache_size
+        # bytes above which multi-row INSERTs and large IN lists are split
+        # into several executions, None to send statements whole
+        self.max_statement_size = max_statement_size
+        # schema name -> id, emptied when DDL runs through the engine
+        self._schema_ids = {}
 
     @classmethod
     def dbapi(cls):
@@ -90,6 +146,59 @@ class MonetDialect(default.DefaultDialect):
         opts = url.translate_connect_args()
         return [], opts
 
+    def on_connect_url(self, url):
+        # ?optimizer=... in the URL takes precedence over the argument
+        optimizer = url.query.get("optimizer", self.optimizer)
+        if optimizer is None:
+            return None
+
+        def set_optimizer(dbapi_connection):
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SET optimizer = %s" % quote(optimizer))
+            finally:
+                cursor.close()
+            # don't hand out the connection with a transaction open; the
+            # optimizer stays, session settings aren't transactional
+            if not self._is_autocommit(dbapi_connection):
+                dbapi_connection.rollback()
+
+        return set_optimizer
+
+    @classmethod
+    def engine_created(cls, engine):
+        # listeners of the pool are carried over by dispose()
+        event.listen(engine, "checkin", engine.dialect._restore_session)
+
+    def _restore_session(self, dbapi_connection, connection_record):
+        """Put back the session settings changed during a checkout."""
+        if dbapi_connection is None:
+            # invalidated
+            return
+        state = connection_record.info.get(SESSION_STATE)
+        if state and restore_session_settings(self, dbapi_connection, state):
+            # the pool has ended the transaction already, end the one the
+            # SETs started; session settings are not transactional
+            self.do_rollback(dbapi_connection)
+
+    def get_session_id(self, dbapi_connection, query=True):
+        """Return the server session id of `dbapi_connection`.
+
+        The id is queried on the connection the first time, which must
+        therefore not be busy, and remembered for its lifetime. With
+        `query` False an id not known yet is returned as None.
+        """
+        session_id = self._session_ids.get(dbapi_connection)
+        if session_id is None and query:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT sys.current_sessionid()")
+                session_id = cursor.fetchone()[0]
+            finally:
+                cursor.close()
+            self._session_ids[dbapi_connection] = session_id
+        return session_id
+
     def create_execution_context(self, *args, **kwargs):
         return MonetExecutionContext(self, *args, **kwargs)
 
@@ -100,12 +209,50 @@ class MonetDialect(default.DefaultDialect):
             SELECT name
             FROM sys.tables
             WHERE system = false
-            AND type = 0
+            AND type in ( %s )
             AND schema_id = :schema_id
-        """
+        """ % (
+            ", ".join(str(tt) for tt in TABLE_TYPES)
+        )
         args = {"schema_id": self._schema_id(connection, schema)}
         return [row[0] for row in connection.execute(text(q), args)]
 
+    @reflection.cache
+    def get_table_options(
+        self, connection: "Connection", table_name, schema=None, **kw
+    ):
+        """Return the MonetDB specific options of `table_name`.
+
+        Merge, replica, unlogged and remote tables are reported through the
+        ``monetdb_merge``, ``monetdb_replica``, ``monetdb_unlogged`` and
+        ``monetdb_remote`` options, which are the same keyword arguments accepted by
+        :class:`.Table`.
+        """
+        q = """
+            SELECT type, query
+            FROM sys.tables
+            WHERE name = :name
+            AND schema_id = :schema_id
+        """
+        args = {"name": table_name, "schema_id": self._schema_id(connection, schema)}
+        row = connection.execute(text(q), args).first()
+        if row is None:
+            raise exc.NoSuchTableError(
+                f"{schema}.{table_name}" if schema else table_name
+            )
+
+        options = {}
+        if row.type == MERGE_TABLE:
+            options["monetdb_merge"] = True
+        elif row.type == REPLICA_TABLE:
+            options["monetdb_replica"] = True
+        elif row.type == UNLOGGED_TABLE:
+            options["monetdb_unlogged"] = True
+        elif row.type == REMOTE_TABLE:
+            # the query column holds the mapi uri of a remote table
+            options["monetdb_remote"] = row.query
+        return options
+
     @reflection.cache
     def get_temp_table_names(self, con: "Connection", **kw):
         # 30 is table type LOCAL TEMPORARY
@@ -130,8 +277,64 @@ class MonetDialect(default.DefaultDialect):
                         return True
         return False
 
+    def _catalog_snapshot(self, connection: "Connection", schema=None):
+        """Return the table and sequence names of `schema` as two sets.
+
+        ``create_all()`` and ``drop_all()`` with ``checkfirst=True`` call
+        has_table / has_sequence once per object. Inside a transaction these
+        probes are answered from a single catalog query per schema. The
+        snapshot is discarded as soon as any other statement runs on the
+        connection or the transaction ends, so it only lives across a run of
+        consecutive probes. Returns None in autocommit mode, where other
+        sessions may change the catalog between two probes.
+        """
+        transaction = connection.get_transaction()
+        if (
+            transaction is None
+            or connection.get_isolation_level() == "AUTOCOMMIT"
+        ):
+            return None
+
+        owner, snapshots = connection.info.get(CATALOG_SNAPSHOT, (None, None))
+        if owner is not transaction:
+            snapshots = {}
+            connection.info[CATALOG_SNAPSHOT] = (transaction, snapshots)
+        elif schema in snapshots:
+            return snapshots[schema]
+
+        q = """
+            SELECT 'table' AS kind, t.name
+            FROM sys.tables t, sys.schemas s
+            WHERE t.system = FALSE
+            AND t.schema_id = s.id
+            AND t.type in ( %(types)s )
+            AND s.name = %(schema)s
+            UNION ALL
+            SELECT 'sequence' AS kind, q.name
+            FROM sys.sequences q, sys.schemas s
+            WHERE q.schema_id = s.id
+            AND s.name = %(schema)s
+        """ % {
+            "types": ", ".join(str(tt) for tt in TABLE_TYPES + [VIEW]),
+            "schema": ":schema" if schema else "CURRENT_SCHEMA",
+        }
+        args = {"schema": schema} if schema else {}
+        c = connection.execute(
+            text(q).execution_options(monetdb_catalog_probe=True), args
+        )
+        tables, sequences = set(), set()
+        for kind, name in c:
+            (tables if kind == "table" else sequences).add(name)
+
+        snapshots[schema] = (tables, sequences)
+        return tables, sequences
+
     @reflection.cache
     def has_table(self, connection: "Connection", table_name, schema=None, **kw):
+        snapshot = self._catalog_snapshot(connection, schema)
+        if snapshot is not None:
+            return table_name in snapshot[0]
+
         if schema is None:
             cursor = connection.execute(
                 text(
@@ -139,9 +342,10 @@ class MonetDialect(default.DefaultDialect):
                     "FROM sys.tables, sys.schemas "
                     "WHERE tables.system = FALSE "
                     "AND tables.schema_id = schemas.id "
-                    "AND type in ( 0, 1) "
+                    "AND type in ( %s ) "
                     "AND tables.name = :name "
-                    "AND schemas.name = CURRENT_SCHEMA",
+                    "AND schemas.name = CURRENT_SCHEMA"
+                    % ", ".join(str(tt) for tt in TABLE_TYPES + [VIEW]),
                 ),
                 {"name": table_name},
             )
@@ -153,9 +357,10 @@ class MonetDialect(default.DefaultDialect):
                     "FROM sys.tables, sys.schemas "
                     "WHERE tables.system = FALSE "
                     "AND tables.schema_id = schemas.id "
-                    "AND type in ( 0, 1 ) "
+                    "AND type in ( %s ) "
                     "AND tables.name = :name "
-                    "AND schemas.name = :schema",
+                    "AND schemas.name = :schema"
+                    % ", ".join(str(tt) for tt in TABLE_TYPES + [VIEW]),
                 ),
                 {"name": table_name, "schema": schema},
             )
@@ -165,6 +370,10 @@ class MonetDialect(default.DefaultDialect):
 
     @reflection.cache
     def has_sequence(self, connection: "Connection", sequence_name, schema=None, **kw):
+        snapshot = self._catalog_snapshot(connection, schema)
+        if snapshot is not None:
+            return sequence_name in snapshot[1]
+
         if schema is None:
             q = """ SELECT id FROM sys.sequences WHERE name = :name AND schema_id = (select id from schemas where name = CURRENT_SCHEMA) """
             args = {"name": sequence_name}
@@ -176,7 +385,7 @@ class MonetDialect(default.DefaultDialect):
         return bool(res)
 
     def _get_sequence( self, connection: "Connection", sequence, schema: Optional[str] = None, **kw):
-        q = "SELECT name, start, increment FROM sys.sequences"
+        q = "SELECT name, start, increment, minvalue, maxvalue, cacheinc, cycle FROM sys.sequences"
         if schema:
             q += " where name = :sequence and schema_id = (select id from schemas where name = :schema)"
             args = {"sequence": sequence, "schema": schema}
@@ -217,6 +426,9 @@ class MonetDialect(default.DefaultDialect):
         if schema_name is None:
             schema_name = con.execute(text("SELECT current_schema")).scalar()
 
+        schema_id = self._schema_ids.get(schema_name)
+        if schema_id is not None:
+            return schema_id
         query = """
                     SELECT id
                     FROM sys.schemas
@@ -227,8 +439,17 @@ class MonetDialect(default.DefaultDialect):
         schema_id = cursor.scalar()
         if schema_id is None:
             raise exc.InvalidRequestError(schema_name)
+        self._schema_ids[schema_name] = schema_id
         return schema_id
 
+    def clear_schema_ids(self):
+        """Forget the cached schema ids.
+
+        They are dropped whenever DDL runs through the engine; call this
+        after other clients dropped and recreated schemas.
+        """
+        self._schema_ids.clear()
+
     @reflection.cache
     def _table_id(self, con: "Connection", table_name, schema_name=None):
         """Fetch the id for schema.table_name, defaulting to current schema if
@@ -255,7 +476,7 @@ class MonetDialect(default.DefaultDialect):
         filter_names=[],
         schema=None,
         temp=0,
-        tabletypes=[0, 1],
+        tabletypes=TABLE_TYPES + [VIEW],
         **kw,
     ):
         ischema = schema
@@ -346,16 +567,28 @@ class MonetDialect(default.DefaultDialect):
                 for (name, seq) in sequences:
                     seq_info = self._get_sequence(connection, seq, schema=seq_schema);
                     if seq_info:
+                        seq_row = seq_info[0]
                         for c in result:
                             if c["name"] == name:
-                                c["identity"] = {"start": seq_info[0][1],
-                                                 "increment": seq_info[0][2] }
+                                c["identity"] = {
+                                    "start": seq_row.start,
+                                    "increment": seq_row.increment,
+                                    "minvalue": seq_row.minvalue,
+                                    "maxvalue": seq_row.maxvalue,
+                                    "cache": seq_row.cacheinc,
+                                    "cycle": bool(seq_row.cycle),
+                                }
 
         return columns.items()
 
     def get_columns(self, connection: "Connection", table_name, schema=None, **kw):
         data = self._get_columns(
-            connection, [table_name], schema, temp=0, tabletypes=[0, 1], **kw
+            connection,
+            [table_name],
+            schema,
+            temp=0,
+            tabletypes=TABLE_TYPES + [VIEW],
+            **kw,
         )
         return self._value_or_raise(data, table_name, schema)
 
@@ -389,9 +622,9 @@ class MonetDialect(default.DefaultDialect):
                     filter_names += self.get_view_names(connection, schema)
 
         if temp == 0 and ObjectKind.TABLE in kind:
-            tabletypes.append(0)
+            tabletypes.extend(TABLE_TYPES)
         if temp == 0 and ObjectKind.VIEW in kind:
-            tabletypes.append(1)
+            tabletypes.append(VIEW)
         return self._get_columns(
             connection, filter_names, schema, temp=temp, tabletypes=tabletypes, **kw
         )
@@ -414,7 +647,7 @@ class MonetDialect(default.DefaultDialect):
         schema=None,
         filter_names=[],
         temp=0,
-        tabletypes=[0, 1],
+        tabletypes=TABLE_TYPES + [VIEW],
         **kw,
     ):
         """Return information about foreign_keys in `table_name`.
@@ -556,7 +789,7 @@ ORDER BY fk_t, fk, o
             schema=schema,
             filter_names=[table_name],
             temp=0,
-            tabletypes=[0, 1],
+            tabletypes=TABLE_TYPES + [VIEW],
             **kw,
         )
         return self._value_or_raise(data, table_name, schema)
@@ -593,9 +826,9 @@ ORDER BY fk_t, fk, o
                     filter_names += self.get_view_names(connection, schema)
 
         if temp == 0 and ObjectKind.TABLE in kind:
-            tabletypes.append(0)
+            tabletypes.extend(TABLE_TYPES)
         if temp == 0 and ObjectKind.VIEW in kind:
-            tabletypes.append(1)
+            tabletypes.append(VIEW)
         return self._get_foreign_keys(
             connection,
             schema=schema,
@@ -611,7 +844,7 @@ ORDER BY fk_t, fk, o
         filter_names=[],
         schema=None,
         temp=0,
-        tabletypes=[0, 1],
+        tabletypes=TABLE_TYPES + [VIEW],
         **kw,
     ):
         """
@@ -713,7 +946,12 @@ ORDER BY fk_t, fk, o
 
     def get_indexes(self, connection: "Connection", table_name, schema=None, **kw):
         data = self._get_indexes(
-            connection, [table_name], schema, temp=0, tabletypes=[0, 1], **kw
+            connection,
+            [table_name],
+            schema,
+            temp=0,
+            tabletypes=TABLE_TYPES + [VIEW],
+            **kw,
         )
         return self._value_or_raise(data, table_name, schema)
 
@@ -747,21 +985,48 @@ ORDER BY fk_t, fk, o
                     filter_names += self.get_view_names(connection, schema)
 
         if temp == 0 and ObjectKind.TABLE in kind:
-            tabletypes.append(0)
+            tabletypes.extend(TABLE_TYPES)
         if temp == 0 and ObjectKind.VIEW in kind:
-            tabletypes.append(1)
+            tabletypes.append(VIEW)
         return self._get_indexes(
             connection, filter_names, schema, temp=temp, tabletypes=tabletypes, **kw
         )
 
+    def do_execute(self, cursor, statement, parameters, context=None):
+        if context is None or context.chunks is None:
+            cursor.execute(statement, parameters)
+        else:
+            context.execute_chunks(cursor)
+
+    def _is_autocommit(self, dbapi_connection):
+        return dbapi_connection.autocommit
+
     def do_commit(self, connection):
-        if not connection.autocommit:
+        if not self._is_autocommit(connection):
             connection.commit()
 
     def do_rollback(self, connection):
-        if not connection.autocommit:
+        if not self._is_autocommit(connection):
             connection.rollback()
 
+    def _check_savepoint(self, connection):
+        if self._is_autocommit(connection.connection.dbapi_connection):
+            raise exc.InvalidRequestError(
+                "MonetDB does not support SAVEPOINT in autocommit mode"
+            )
+
+    def do_savepoint(self, connection, name):
+        self._check_savepoint(connection)
+        super(MonetDialect, self).do_savepoint(connection, name)
+
+    def do_rollback_to_savepoint(self, connection, name):
+        self._check_savepoint(connection)
+        super(MonetDialect, self).do_rollback_to_savepoint(connection, name)
+
+    def do_release_savepoint(self, connection, name):
+        self._check_savepoint(connection)
+        super(MonetDialect, self).do_release_savepoint(connection, name)
+
     @reflection.cache
     def get_schema_names(self, con: "Connection", **kw):
         s = """
@@ -956,18 +1221,19 @@ ORDER BY fk_t, fk, o
         )
 
     def set_isolation_level(self, dbapi_connection, level):
-        if level == "AUTOCOMMIT":
-            dbapi_connection.set_autocommit(True)
-        else:
-            dbapi_connection.set_autocommit(False)
-            # cursor = dbapi_connection.cursor()
-            # print("todo ISO level %s\n" % level)
-            # cursor.execute( "SET SESSION CHARACTERISTICS AS TRANSACTION " f"ISOLATION LEVEL {level}"
-            # cursor.execute("COMMIT")
-            # cursor.close()
+        autocommit = level == "AUTOCOMMIT"
+        # switching costs a round trip, and the pool resets the level on
+        # every checkin
+        if self._is_autocommit(dbapi_connection) != autocommit:
+            dbapi_connection.set_autocommit(autocommit)
+        # cursor = dbapi_connection.cursor()
+        # print("todo ISO level %s\n" % level)
+        # cursor.execute( "SET SESSION CHARACTERISTICS AS TRANSACTION " f"ISOLATION LEVEL {level}"
+        # cursor.execute("COMMIT")
+        # cursor.close()
 
     def get_isolation_level(self, dbapi_connection):
-        if dbapi_connection.autocommit:
+        if self._is_autocommit(dbapi_connection):
             return "AUTOCOMMIT"
         return "SERIALIZABLE"
         # cursor = dbapi_connection.cursor()
@@ -975,3 +1241,19 @@ ORDER BY fk_t, fk, o
         # val = cursor.fetchone()[0]
         # cursor.close()
         # return val.upper()
+
+
+@event.listens_for(MonetDialect, "handle_error")
+def _classify_error(context):
+    """Raise concurrency conflicts as :class:`.ConcurrencyConflictError`."""
+    wrapped = context.sqlalchemy_exception
+    if wrapped is None or not is_concurrency_conflict(context.original_exception):
+        return None
+    return ConcurrencyConflictError(
+        wrapped.statement,
+        wrapped.params,
+        context.original_exception,
+        hide_parameters=wrapped.hide_parameters,
+        connection_invalidated=wrapped.connection_invalidated,
+        ismulti=wrapped.ismulti,
+    )
@@ -0,0 +1,80 @@
+"""
+MonetDB/e dialect, running an embedded MonetDB inside the Python process
+through the monetdbe library.
+
+URLs name the database directory, or ``:memory:`` (the default) for an
+in-memory database::
+
+    monetdb+monetdbe://                     in-memory
+    monetdb+monetdbe:///:memory:            in-memory
+    monetdb+monetdbe:///relative/dbfarm
+    monetdb+monetdbe:////absolute/dbfarm
+
+``nr_threads``, ``memorylimit`` (MB), ``querytimeout`` and ``timeout``
+(seconds) are passed on to monetdbe when given in the URL query string.
+
+monetdbe connections must not be used from several threads, so the
+engine keeps one connection per thread in a
+:class:`~sqlalchemy.pool.SingletonThreadPool`. With a database directory
+those connections all see the same database. Every connection to
+``:memory:`` however opens a database of its own: each thread of an
+in-memory engine works on a separate, initially empty database and
+doesn't see the tables of the others. Use a database directory to share
+data between threads.
+"""
+
+import weakref
+
+from sqlalchemy import pool
+
+from sqlalchemy_monetdb.compiler import MonetCompiler
+from sqlalchemy_monetdb.dialect import MonetDialect
+
+
+class MonetDBECompiler(MonetCompiler):
+    def visit_mod(self, binary, **kw):
+        # statements go to the engine unformatted, don't escape the %
+        return self.process(binary.left) + " % " + self.process(binary.right)
+
+
+class MonetDBEDialect(MonetDialect):
+    supports_statement_cache = True
+    driver = "monetdbe"
+
+    statement_compiler = MonetDBECompiler
+
+    # monetdbe connections may only be used by the thread that opened them,
+    # and every connection to :memory: opens a database of its own
+    poolclass = pool.SingletonThreadPool
+
+    def __init__(self, **kwargs):
+        MonetDialect.__init__(self, **kwargs)
+        # monetdbe connections don't expose their autocommit mode
+        self._autocommit = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def import_dbapi(cls):
+        return __import__("monetdbe")
+
+    def create_connect_args(self, url):
+        opts = {"database": url.database or ":memory:", "autocommit": False}
+        for name in ("nr_threads", "memorylimit", "querytimeout", "timeout"):
+            if name in url.query:
+                opts[name] = int(url.query[name])
+        return [], opts
+
+    def _is_autocommit(self, dbapi_connection):
+        dbapi_connection = getattr(
+            dbapi_connection, "dbapi_connection", dbapi_connection
+        )
+        return self._autocommit.get(dbapi_connection, False)
+
+    def set_isolation_level(self, dbapi_connection, level):
+        MonetDialect.set_isolation_level(self, dbapi_connection, level)
+        dbapi_connection = getattr(
+            dbapi_connection, "dbapi_connection", dbapi_connection
+        )
+        self._autocommit[dbapi_connection] = level == "AUTOCOMMIT"
+
+
+dialect = MonetDBEDialect
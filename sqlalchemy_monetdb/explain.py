@@ -0,0 +1,68 @@
+"""
+Inspect how MonetDB executes a statement.
+
+The statement is compiled and its parameters are bound exactly as for a
+normal execution, and is then sent with one of MonetDB's ``EXPLAIN``,
+``PLAN`` or ``TRACE`` prefixes::
+
+    from sqlalchemy_monetdb.explain import monetdb_explain, monetdb_trace
+
+    with engine.connect() as conn:
+        for instruction in monetdb_explain(conn, session_query.statement):
+            print(instruction)
+
+        trace = monetdb_trace(conn, stmt)
+        slowest = sorted(trace.instructions, reverse=True)[:10]
+"""
+import collections
+
+from sqlalchemy import text
+
+
+TraceInstruction = collections.namedtuple("TraceInstruction", ["usec", "statement"])
+TraceInstruction.__doc__ = """A MAL instruction and the microseconds it took."""
+
+Trace = collections.namedtuple("Trace", ["rows", "instructions"])
+Trace.__doc__ = """The result rows of a traced statement and its
+:class:`TraceInstruction` list in execution order."""
+
+
+def _execute(connection, statement, parameters, prefix):
+    if isinstance(statement, str):
+        statement = text(statement)
+    return connection.execute(
+        statement,
+        parameters,
+        execution_options={"monetdb_statement_prefix": prefix},
+    )
+
+
+def _raw_lines(result):
+    # the single text column replaces the statement's own columns, so skip
+    # the result processing set up for those
+    try:
+        return [row[0] for row in result.cursor.fetchall()]
+    finally:
+        result.close()
+
+
+def monetdb_explain(connection, statement, parameters=None):
+    """Return the MAL program of `statement` as a list of lines."""
+    return _raw_lines(_execute(connection, statement, parameters, "EXPLAIN"))
+
+
+def monetdb_plan(connection, statement, parameters=None):
+    """Return the relational plan of `statement` as a list of lines."""
+    return _raw_lines(_execute(connection, statement, parameters, "PLAN"))
+
+
+def monetdb_trace(connection, statement, parameters=None):
+    """Execute `statement` under ``TRACE`` and return a :class:`Trace`.
+
+    The statement really runs, so DML is applied like any other execution
+    on `connection`.
+    """
+    result = _execute(connection, statement, parameters, "TRACE")
+    rows = result.all() if result.returns_rows else []
+    trace = connection.exec_driver_sql("SELECT ticks, stmt FROM sys.tracelog()")
+    return Trace(rows, [TraceInstruction(*row) for row in trace])
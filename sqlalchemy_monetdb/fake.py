@@ -0,0 +1,641 @@
+"""
+In-process stand-in for pymonetdb, for testing and benchmarking without a
+MonetDB server.
+
+The module is itself a DBAPI module: :func:`connect` returns connections
+whose cursors answer the catalog queries issued by :class:`.MonetDialect`
+from a :class:`Catalog` held in memory. Select it with the ``monetdb+fake``
+URL and hand the catalog to :func:`~sqlalchemy.create_engine`::
+
+    from sqlalchemy_monetdb.fake import Catalog
+
+    catalog = Catalog()
+    catalog.add_table("t", [("id", "int"), ("name", "varchar", 32)],
+                      primary_key=["id"])
+    engine = create_engine("monetdb+fake://", catalog=catalog)
+    inspect(engine).get_columns("t")
+
+Any other statement returns an empty result unless a response was scripted
+with :meth:`Catalog.script`. ``PREPARE``, ``EXEC`` and ``DEALLOCATE`` are
+emulated, an executed prepared statement is answered like its SQL. Every
+statement is recorded in :attr:`Catalog.executed`.
+"""
+
+import collections
+import datetime
+import itertools
+import re
+
+from sqlalchemy_monetdb.dialect import (
+    MonetDialect,
+    TABLE,
+    TABLE_TYPES,
+    VIEW,
+)
+
+apilevel = "2.0"
+threadsafety = 1
+paramstyle = "named"
+
+# sys.table_types id of LOCAL TEMPORARY tables
+LOCAL_TEMPORARY = 30
+
+
+class Warning(Exception):
+    pass
+
+
+class Error(Exception):
+    pass
+
+
+class InterfaceError(Error):
+    pass
+
+
+class DatabaseError(Error):
+    pass
+
+
+class DataError(DatabaseError):
+    pass
+
+
+class OperationalError(DatabaseError):
+    pass
+
+
+class IntegrityError(DatabaseError):
+    pass
+
+
+class InternalError(DatabaseError):
+    pass
+
+
+class ProgrammingError(DatabaseError):
+    pass
+
+
+class NotSupportedError(DatabaseError):
+    pass
+
+
+Column = collections.namedtuple(
+    "Column", "name type digits scale null default"
+)
+Column.__new__.__defaults__ = (0, 0, True, None)
+
+Sequence = collections.namedtuple(
+    "Sequence", "id name start increment minvalue maxvalue cacheinc cycle"
+)
+
+
+class Table(object):
+    def __init__(
+        self,
+        id,
+        schema,
+        name,
+        columns,
+        type=TABLE,
+        temporary=0,
+        query=None,
+        primary_key=None,
+        unique=None,
+        foreign_keys=None,
+        indexes=None,
+    ):
+        self.id = id
+        self.schema = schema
+        self.name = name
+        self.columns = [
+            Column(*c) if not isinstance(c, Column) else c for c in columns
+        ]
+        self.type = type
+        self.temporary = temporary
+        self.query = query
+        self.primary_key = primary_key or []
+        self.unique = unique or {}
+        self.foreign_keys = foreign_keys or []
+        self.indexes = indexes or {}
+
+
+class Catalog(object):
+    """The schemas, tables and sequences served by fake connections.
+
+    `schema` is the current schema of every connection. `version` is
+    reported as the server version.
+    """
+
+    def __init__(self, schema="sys", version="11.51.3", history=1000):
+        self.current_schema = schema
+        self.version = version
+        self.optimizer = "default_pipe"
+        self.role = "monetdb"
+        self.time_zone = datetime.timedelta(0)
+        self.query_timeout = 0
+        self.schemas = {}
+        self.tables = {}
+        self.sequences = {}
+        self.executed = collections.deque(maxlen=history)
+        self._scripts = []
+        self._ids = itertools.count(7000)
+        self._session_ids = itertools.count(1)
+        self._statement_ids = itertools.count(1)
+        self.prepared = {}
+        self.lastrowid = None
+        for name in ("sys", "tmp", schema):
+            self.add_schema(name)
+
+    def add_schema(self, name):
+        if name not in self.schemas:
+            self.schemas[name] = next(self._ids)
+        return self.schemas[name]
+
+    def add_table(self, name, columns, schema=None, **kw):
+        """Add a table.
+
+        `columns` holds ``(name, type[, digits, scale, null, default])``
+        tuples, with types named as in ``sys.columns``. `primary_key` is a
+        list of column names, `unique` and `indexes` map constraint or index
+        names to column lists and `foreign_keys` holds ``(name, columns,
+        referred_schema, referred_table, referred_columns)`` tuples.
+        """
+        schema = schema or self.current_schema
+        self.add_schema(schema)
+        if kw.get("temporary"):
+            schema = "tmp"
+            kw.setdefault("type", LOCAL_TEMPORARY)
+        table = Table(next(self._ids), schema, name, columns, **kw)
+        self.tables[(schema, name)] = table
+        return table
+
+    def add_view(self, name, columns, query, schema=None):
+        return self.add_table(name, columns, schema, type=VIEW, query=query)
+
+    def add_sequence(
+        self,
+        name,
+        schema=None,
+        start=1,
+        increment=1,
+        minvalue=1,
+        maxvalue=2**63 - 1,
+        cache=1,
+        cycle=False,
+    ):
+        schema = schema or self.current_schema
+        self.add_schema(schema)
+        sequence = Sequence(
+            next(self._ids), name, start, increment, minvalue, maxvalue, cache, cycle
+        )
+        self.sequences[(schema, name)] = sequence
+        return sequence
+
+    def script(self, pattern, rows, columns=("value",)):
+        """Answer statements matching the regular expression `pattern`.
+
+        `rows` is a list of tuples, or a callable receiving the statement
+        parameters and returning one. Scripted responses take precedence
+        over the catalog.
+        """
+        self._scripts.append((re.compile(pattern, re.I | re.S), columns, rows))
+
+    def _schema(self, parameters, key="schema"):
+        return parameters.get(key) or self.current_schema
+
+    def _schema_name(self, schema_id):
+        for name, id in self.schemas.items():
+            if id == schema_id:
+                return name
+
+    def _in_schema(self, schema, types, temporary=0):
+        return [
+            t
+            for (s, _), t in self.tables.items()
+            if s == schema and t.type in types and t.temporary == temporary
+        ]
+
+    def respond(self, operation, parameters):
+        """Return ``(columns, rows)`` for a statement."""
+        self.executed.append((operation, parameters))
+        self.lastrowid = None
+        # reserved words are bound as quoted names, e.g. :"table"
+        operation = re.sub(r':"(\w+)"', r":\1", operation)
+        parameters = {k.strip('"'): v for k, v in parameters.items()}
+        for pattern, handler in _PREPARED_HANDLERS:
+            match = pattern.search(operation)
+            if match:
+                return handler(self, operation, parameters, match)
+        return self._answer(operation, parameters)
+
+    def _answer(self, operation, parameters):
+        for pattern, columns, rows in self._scripts:
+            if pattern.search(operation):
+                return columns, rows(parameters) if callable(rows) else rows
+        for pattern, handler in _HANDLERS:
+            match = pattern.search(operation)
+            if match:
+                return handler(self, operation, parameters, match)
+        return None, []
+
+
+def _types(operation):
+    match = re.search(r"\.?type in \(\s*([\d,\s]+)\)", operation)
+    if match is None:
+        return TABLE_TYPES + [VIEW]
+    return [int(t) for t in match.group(1).split(",")]
+
+
+def _literal_names(operation, prefix):
+    match = re.search(prefix + r"\.name in \(\s*(.*?)\s*\)", operation, re.S)
+    return [n.replace("''", "'") for n in re.findall(r"'((?:[^']|'')*)'", match.group(1))]
+
+
+def _literal_schema(catalog, operation, prefix):
+    match = re.search(prefix + r"\.name = '((?:[^']|'')*)'", operation)
+    return match.group(1).replace("''", "'") if match else catalog.current_schema
+
+
+def _version(catalog, operation, parameters, match):
+    return ("value",), [(catalog.version,)]
+
+
+def _session_id(catalog, operation, parameters, match):
+    return ("id",), [(next(catalog._session_ids),)]
+
+
+def _current_schema(catalog, operation, parameters, match):
+    return ("name",), [(catalog.current_schema,)]
+
+
+def _identifier(name):
+    if name.startswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name
+
+
+def _set_schema(catalog, operation, parameters, match):
+    catalog.current_schema = _identifier(match.group(1))
+    return None, []
+
+
+def _current_role(catalog, operation, parameters, match):
+    return ("role",), [(catalog.role,)]
+
+
+def _set_role(catalog, operation, parameters, match):
+    catalog.role = _identifier(match.group(1))
+    return None, []
+
+
+def _current_time_zone(catalog, operation, parameters, match):
+    return ("timezone",), [(catalog.time_zone,)]
+
+
+def _set_time_zone(catalog, operation, parameters, match):
+    sign, hours, minutes = match.groups()
+    offset = datetime.timedelta(hours=int(hours), minutes=int(minutes))
+    catalog.time_zone = -offset if sign == "-" else offset
+    return None, []
+
+
+def _get_optimizer(catalog, operation, parameters, match):
+    return ("optimizer",), [(catalog.optimizer,)]
+
+
+def _set_optimizer(catalog, operation, parameters, match):
+    catalog.optimizer = match.group(1).replace("''", "'")
+    return None, []
+
+
+def _query_timeout(catalog, operation, parameters, match):
+    return ("querytimeout",), [(catalog.query_timeout,)]
+
+
+def _set_query_timeout(catalog, operation, parameters, match):
+    catalog.query_timeout = int(match.group(1))
+    return None, []
+
+
+def _schema_id(catalog, operation, parameters, match):
+    schema_id = catalog.schemas.get(parameters["schema_name"])
+    return ("id",), [(schema_id,)] if schema_id is not None else []
+
+
+def _schema_names(catalog, operation, parameters, match):
+    return ("name",), [(name,) for name in sorted(catalog.schemas)]
+
+
+def _table_names(catalog, operation, parameters, match):
+    schema = catalog._schema_name(parameters["schema_id"])
+    types = TABLE_TYPES if "system = false" in operation else [VIEW]
+    return ("name",), [(t.name,) for t in catalog._in_schema(schema, types)]
+
+
+def _temp_table_names(catalog, operation, parameters, match):
+    tables = catalog._in_schema("tmp", [LOCAL_TEMPORARY], 1)
+    return ("name",), [(t.name,) for t in tables]
+
+
+def _table(catalog, operation, parameters, match):
+    schema = catalog._schema_name(parameters["schema_id"])
+    table = catalog.tables.get((schema, parameters["name"]))
+    if table is None:
+        return ("id",), []
+    if match.group(1) != "id":
+        return ("type", "query"), [(table.type, table.query)]
+    return ("id",), [(table.id,)]
+
+
+def _has_table(catalog, operation, parameters, match):
+    table = catalog.tables.get((catalog._schema(parameters), parameters["name"]))
+    found = table is not None and table.type in _types(operation)
+    return ("name",), [(table.name,)] if found else []
+
+
+def _snapshot(catalog, operation, parameters, match):
+    schema = catalog._schema(parameters)
+    rows = [("table", t.name) for t in catalog._in_schema(schema, _types(operation))]
+    rows += [("sequence", name) for (s, name) in catalog.sequences if s == schema]
+    return ("kind", "name"), rows
+
+
+def _sequences(catalog, operation, parameters, match):
+    schema = catalog._schema(parameters)
+    name = parameters.get("name", parameters.get("sequence"))
+    sequences = [
+        q
+        for (s, _), q in catalog.sequences.items()
+        if s == schema and (name is None or q.name == name)
+    ]
+    columns = [c.strip() for c in match.group(1).split(",")]
+    return columns, [tuple(getattr(q, c) for c in columns) for q in sequences]
+
+
+def _columns(catalog, operation, parameters, match):
+    table = catalog.tables.get((catalog._schema(parameters), parameters["table"]))
+    rows = []
+    if (
+        table is not None
+        and table.temporary == parameters["temp"]
+        and table.type in _types(operation)
+    ):
+        rows = [
+            (c.name, c.type, c.digits, c.scale, c.null, c.default, number)
+            for number, c in enumerate(table.columns)
+        ]
+    return ("name", "type", "digits", "scale", "null", "cdefault", "number"), rows
+
+
+def _table_by_id(catalog, table_id):
+    for table in catalog.tables.values():
+        if table.id == table_id:
+            return table
+
+
+def _primary_key(catalog, operation, parameters, match):
+    table = _table_by_id(catalog, parameters["table_id"])
+    return ("col", "name"), [(c, table.name + "_pkey") for c in table.primary_key]
+
+
+def _unique(catalog, operation, parameters, match):
+    table = _table_by_id(catalog, parameters["table_id"])
+    rows = [(c, n) for n, cols in sorted(table.unique.items()) for c in cols]
+    return ("col", "name"), rows
+
+
+def _check(catalog, operation, parameters, match):
+    return ("name", "sqltext"), []
+
+
+def _filtered_tables(catalog, operation, parameters, schema_alias, table_alias):
+    schema = _literal_schema(catalog, operation, schema_alias)
+    types = _types(operation)
+    tables = [
+        catalog.tables.get((schema, name))
+        for name in _literal_names(operation, table_alias)
+    ]
+    return schema, [
+        t
+        for t in tables
+        if t is not None and t.type in types and t.temporary == parameters["temp"]
+    ]
+
+
+def _foreign_keys(catalog, operation, parameters, match):
+    schema, tables = _filtered_tables(catalog, operation, parameters, "fs", "fkt")
+    rows = []
+    for table in sorted(tables, key=lambda t: t.name):
+        if not table.foreign_keys:
+            rows.append((schema, table.name) + (None,) * 8)
+        for name, cols, ref_schema, ref_table, ref_cols in sorted(table.foreign_keys):
+            for nr, (col, ref_col) in enumerate(zip(cols, ref_cols)):
+                rows.append(
+                    (schema, table.name, col, nr, name, ref_schema or schema,
+                     ref_table, ref_col, "NO ACTION", "NO ACTION")
+                )
+    columns = ("fk_s", "fk_t", "fk_c", "o", "fk", "pk_s", "pk_t", "pk_c",
+               "on_update", "on_delete")
+    return columns, rows
+
+
+def _indexes(catalog, operation, parameters, match):
+    schema, tables = _filtered_tables(catalog, operation, parameters, "s", "t")
+    rows = []
+    for table in sorted(tables, key=lambda t: t.name):
+        indexes = [(n, cols, "INDEX") for n, cols in table.indexes.items()]
+        indexes += [(n, cols, "UNIQUE") for n, cols in table.unique.items()]
+        if not indexes:
+            rows.append((None, schema, table.name, None, None, None))
+        for name, cols, kind in sorted(indexes):
+            rows.extend(
+                (name, schema, table.name, col, kind, nr)
+                for nr, col in enumerate(cols)
+            )
+    return ("ind", "sch", "tbl", "col", "tpe", "knr"), rows
+
+
+def _view_definition(catalog, operation, parameters, match):
+    schema = catalog._schema_name(parameters["schema_id"])
+    table = catalog.tables.get((schema, parameters["name"]))
+    found = table is not None and table.type == VIEW
+    return ("query",), [(table.query,)] if found else []
+
+
+# the separators of a VALUES list, outside of string literals
+_NEXT_ROW = re.compile(r"'(?:[^'\\]|\\.|'')*'|\)\s*,\s*\(")
+
+
+def _insert(catalog, operation, parameters, match):
+    rows = 1 + sum(1 for m in _NEXT_ROW.finditer(operation) if m.group(0)[0] != "'")
+    # no result set, only a row count
+    return None, [()] * rows
+
+
+def _prepare(catalog, operation, parameters, match):
+    catalog.lastrowid = statement_id = next(catalog._statement_ids)
+    catalog.prepared[statement_id] = match.group(1)
+    return ("type", "digits", "scale", "schema", "table", "column"), []
+
+
+def _exec(catalog, operation, parameters, match):
+    statement = catalog.prepared.get(int(match.group(1)))
+    if statement is None:
+        raise ProgrammingError("no prepared statement with id: %s" % match.group(1))
+    return catalog._answer(statement, {})
+
+
+def _deallocate(catalog, operation, parameters, match):
+    if match.group(1).upper() == "ALL":
+        catalog.prepared.clear()
+    else:
+        catalog.prepared.pop(int(match.group(1)), None)
+    return None, []
+
+
+_PREPARED_HANDLERS = [
+    (re.compile(pattern, re.I | re.S), handler)
+    for pattern, handler in (
+        (r"^\s*PREPARE (.*)$", _prepare),
+        (r"^\s*EXEC (\d+)\(.*\)\s*$", _exec),
+        (r"^\s*DEALLOCATE PREPARE (\w+)\s*$", _deallocate),
+    )
+]
+
+_HANDLERS = [
+    (re.compile(pattern, re.I | re.S), handler)
+    for pattern, handler in (
+        (r"name = 'monet_version'", _version),
+        (r"^\s*SELECT sys\.current_sessionid\(\)\s*$", _session_id),
+        (r"^\s*SELECT current_schema\s*$", _current_schema),
+        (r"^\s*SET SCHEMA (.+?)\s*$", _set_schema),
+        (r"^\s*SELECT current_role\s*$", _current_role),
+        (r"^\s*SET ROLE (.+?)\s*$", _set_role),
+        (r"^\s*SELECT current_timezone\s*$", _current_time_zone),
+        (r"^\s*SET TIME ZONE INTERVAL '([+-])(\d+):(\d+)' HOUR TO MINUTE", _set_time_zone),
+        (r"^\s*SELECT optimizer\s*$", _get_optimizer),
+        (r"^\s*SET optimizer = '((?:[^']|'')*)'", _set_optimizer),
+        (r"SELECT querytimeout FROM sys\.sessions", _query_timeout),
+        (r"^\s*CALL sys\.setquerytimeout\((\d+)\)\s*$", _set_query_timeout),
+        (r"FROM sys\.schemas\s+WHERE name = :schema_name", _schema_id),
+        (r"SELECT name FROM sys\.schemas ORDER BY name", _schema_names),
+        (r"SELECT name\s+FROM sys\.tables\s+WHERE (system = false|type = 1)", _table_names),
+        (r"SELECT tables\.name FROM sys\.tables WHERE schema_id = \(", _temp_table_names),
+        (r"SELECT (type, query|id)\s+FROM sys\.tables\s+WHERE name = :name", _table),
+        (r"SELECT tables\.name FROM sys\.tables, sys\.schemas", _has_table),
+        (r"SELECT 'table' AS kind", _snapshot),
+        (r"SELECT ((?:\w+, )*\w+) FROM sys\.sequences", _sequences),
+        (r"c\.type_digits digits", _columns),
+        (r'"keys"\."type" = 0', _primary_key),
+        (r"k\.type = 1\s+AND t\.id = :table_id", _unique),
+        (r"sys\.check_constraint", _check),
+        (r"WITH action_type", _foreign_keys),
+        (r"WITH it \(id, idx\)", _indexes),
+        (r"SELECT query FROM sys\.tables", _view_definition),
+        (r"^\s*INSERT INTO .* VALUES\s*\(", _insert),
+    )
+]
+
+
+class Cursor(object):
+    arraysize = 1
+    lastrowid = None
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, operation, parameters=None):
+        catalog = self.connection.catalog
+        columns, rows = catalog.respond(operation, parameters or {})
+        self.lastrowid = catalog.lastrowid
+        self.description = (
+            [(c, None, None, None, None, None, None) for c in columns]
+            if columns
+            else None
+        )
+        self._rows = list(rows)
+        self.rowcount = len(self._rows)
+        return self.rowcount
+
+    def executemany(self, operation, seq_of_parameters):
+        count = 0
+        for parameters in seq_of_parameters:
+            count += self.execute(operation, parameters)
+        self.rowcount = count
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def setinputsizes(self, sizes):
+        pass
+
+    def setoutputsize(self, size, column=None):
+        pass
+
+    def close(self):
+        self._rows = []
+
+
+class Connection(object):
+    def __init__(self, catalog, autocommit=False):
+        self.catalog = catalog
+        self.autocommit = autocommit
+
+    def cursor(self):
+        return Cursor(self)
+
+    def set_autocommit(self, autocommit):
+        self.autocommit = autocommit
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def connect(catalog=None, autocommit=False, **kwargs):
+    return Connection(catalog if catalog is not None else Catalog(), autocommit)
+
+
+class MonetFakeDialect(MonetDialect):
+    """MonetDB dialect on top of the in-process fake DBAPI.
+
+    Accepts a `catalog` argument; without one every engine gets its own
+    empty :class:`Catalog`.
+    """
+
+    supports_statement_cache = True
+    driver = "fake"
+
+    def __init__(self, catalog=None, **kwargs):
+        MonetDialect.__init__(self, **kwargs)
+        self.catalog = catalog if catalog is not None else Catalog()
+
+    @classmethod
+    def import_dbapi(cls):
+        return __import__("sqlalchemy_monetdb.fake", fromlist="fake")
+
+    def create_connect_args(self, url):
+        args, opts = MonetDialect.create_connect_args(self, url)
+        return args, {"catalog": self.catalog}
+
+
+dialect = MonetFakeDialect
@@ -0,0 +1,156 @@
+"""
+Client side statement statistics, aggregated per query fingerprint.
+
+Statements are normalized into a fingerprint: literals and bind
+parameters become ``?``, IN lists and multi-row VALUES collapse into a
+single entry, and whitespace is squeezed. Statements differing only in
+their values or list lengths therefore share one entry::
+
+    from sqlalchemy_monetdb.fingerprint import StatementStats
+
+    stats = StatementStats(max_entries=1000)
+    stats.install(engine)
+    ...
+    for entry in stats.top(10):
+        print(entry["total_ms"], entry["calls"], entry["fingerprint"])
+"""
+import collections
+import math
+import re
+import threading
+import time
+
+from sqlalchemy import event
+
+_TOKENS = re.compile(
+    r"""
+    ("(?:[^"]|"")*")                      # quoted identifier, kept
+    | '(?:[^']|'')*'                      # string literal
+    | %\([^)]*\)s                         # pyformat bind
+    | :(?:"(?:[^"]|"")*"|[A-Za-z_]\w*)    # named bind
+    | (?<![\w.])-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?   # number
+    """,
+    re.X,
+)
+_WHITESPACE = re.compile(r"\s+")
+_COMMA = re.compile(r" ?, ?")
+_PARENS = re.compile(r"\( | \)")
+_IN_LIST = re.compile(r"\bIN \((?:\?, )*\?\)", re.I)
+_ROW = r"\((?:\?, )*\?\)"
+_ROWS = re.compile(r"(%s)(?:, %s)+" % (_ROW, _ROW))
+
+
+def fingerprint(statement):
+    """Return the normalized form of the SQL `statement`."""
+    text = _TOKENS.sub(lambda m: m.group(1) or "?", statement)
+    text = _WHITESPACE.sub(" ", text).strip()
+    text = _COMMA.sub(", ", text)
+    text = _PARENS.sub(lambda m: m.group(0).strip(), text)
+    text = _IN_LIST.sub(lambda m: m.group(0)[:2] + " (...)", text)
+    return _ROWS.sub("(...)", text)
+
+
+class _Entry(object):
+    __slots__ = ("calls", "total", "min", "max", "rows", "samples")
+
+    def __init__(self, samples):
+        self.calls = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.rows = 0
+        self.samples = collections.deque(maxlen=samples)
+
+
+class StatementStats(object):
+    """Bounded table of statistics per statement fingerprint.
+
+    max_entries
+      number of fingerprints kept; the least recently executed one is
+      evicted when a new fingerprint arrives in a full table
+
+    samples
+      number of most recent durations kept per fingerprint to estimate the
+      95th percentile
+    """
+
+    def __init__(self, max_entries=1000, samples=128):
+        self.max_entries = max_entries
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        # statement text -> fingerprint, so repeated statements skip the regexes
+        self._fingerprints = collections.OrderedDict()
+
+    def install(self, engine):
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def remove(self, engine):
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        started = getattr(context, "execute_started", None)
+        if started is None:
+            return
+        rowcount = cursor.rowcount
+        self.record(
+            statement, time.perf_counter() - started, rowcount if rowcount > 0 else 0
+        )
+
+    def _fingerprint(self, statement):
+        fp = self._fingerprints.get(statement)
+        if fp is None:
+            fp = self._fingerprints[statement] = fingerprint(statement)
+            if len(self._fingerprints) > self.max_entries:
+                self._fingerprints.popitem(last=False)
+        return fp
+
+    def record(self, statement, duration, rows=0):
+        """Add one execution of `statement` taking `duration` seconds."""
+        with self._lock:
+            fp = self._fingerprint(statement)
+            entry = self._entries.get(fp)
+            if entry is None:
+                entry = self._entries[fp] = _Entry(self.samples)
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(fp)
+            entry.calls += 1
+            entry.total += duration
+            entry.min = min(entry.min, duration)
+            entry.max = max(entry.max, duration)
+            entry.rows += rows
+            entry.samples.append(duration)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+    def entries(self):
+        """Return a dict per fingerprint, durations in milliseconds."""
+        with self._lock:
+            items = list(self._entries.items())
+            result = []
+            for fp, e in items:
+                samples = sorted(e.samples)
+                p95 = samples[max(0, math.ceil(len(samples) * 0.95) - 1)]
+                result.append(
+                    {
+                        "fingerprint": fp,
+                        "calls": e.calls,
+                        "total_ms": e.total * 1000,
+                        "mean_ms": e.total * 1000 / e.calls,
+                        "min_ms": e.min * 1000,
+                        "max_ms": e.max * 1000,
+                        "p95_ms": p95 * 1000,
+                        "rows": e.rows,
+                    }
+                )
+        return result
+
+    def top(self, n=10, key="total_ms"):
+        """Return the `n` entries with the highest `key`."""
+        return sorted(self.entries(), key=lambda e: e[key], reverse=True)[:n]
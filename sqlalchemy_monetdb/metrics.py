@@ -0,0 +1,193 @@
+"""
+Counters of the work done by the dialect.
+
+Metrics are off by default. :func:`install_metrics` enables them for one
+engine and returns its :class:`DialectMetrics`::
+
+    from sqlalchemy_monetdb.metrics import install_metrics, prometheus_text
+
+    metrics = install_metrics(engine)
+    ...
+    print(metrics.snapshot())
+    print(prometheus_text(metrics, labels={"engine": "reporting"}))
+
+Compile time is measured in :class:`.MonetCompiler`. Round trips, bytes
+sent and fetches are counted by the cursors :class:`.MonetExecutionContext`
+works with, statements, errors, execution time, connections and checkouts
+through engine, dialect and pool events, which outlive
+``engine.dispose()``. Nothing reaches into the DBAPI connection, so the
+counters work the same on every driver:
+
+* a round trip is one statement sent, a result spanning several blocks
+  costs more than one request on the wire
+* bytes sent are the UTF-8 size of the SQL text and the literals of its
+  parameters; bytes received are not known
+* connect time is the time spent opening DBAPI connections, time spent
+  waiting for a pooled connection is not included
+"""
+import threading
+import time
+
+from sqlalchemy import event
+
+from sqlalchemy_monetdb.compiler import encoded_size, sql_literal
+
+# connection_record.info key of the start of DBAPI connect
+_CONNECT_STARTED = "monetdb_metrics_connect_started"
+
+
+COUNTERS = (
+    ("statements", "Statements executed"),
+    ("errors", "DBAPI errors raised"),
+    ("round_trips", "Requests sent to the server"),
+    ("bytes_sent", "Bytes of SQL text sent to the server"),
+    ("rows_fetched", "Rows fetched from result sets"),
+    ("connections", "DBAPI connections opened"),
+    ("checkouts", "Connections checked out from the pool"),
+    ("compile_seconds", "Time spent compiling SQL statements"),
+    ("execute_seconds", "Time spent executing statements"),
+    ("fetch_seconds", "Time spent fetching rows"),
+    ("connect_seconds", "Time spent opening DBAPI connections"),
+)
+
+
+class DialectMetrics(object):
+    """Thread safe counters, see :data:`COUNTERS` for their names."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._values = dict.fromkeys((name for name, _ in COUNTERS), 0)
+
+    def add(self, name, value=1):
+        with self._lock:
+            self._values[name] += value
+
+    def snapshot(self):
+        """Return a dict with the current value of every counter."""
+        with self._lock:
+            return dict(self._values)
+
+
+def _sent_size(operation, parameters):
+    if isinstance(parameters, dict):
+        parameters = parameters.values()
+    return encoded_size(operation) + sum(
+        encoded_size(sql_literal(value)) for value in parameters or ()
+    )
+
+
+class MeteredCursor(object):
+    """DBAPI cursor proxy counting the statements sent, the rows fetched and
+    the time fetching took."""
+
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, operation, parameters=None):
+        with self._metrics._lock:
+            values = self._metrics._values
+            values["round_trips"] += 1
+            values["bytes_sent"] += _sent_size(operation, parameters)
+        return self._cursor.execute(operation, parameters)
+
+    def executemany(self, operation, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        with self._metrics._lock:
+            values = self._metrics._values
+            values["round_trips"] += len(seq_of_parameters)
+            values["bytes_sent"] += sum(
+                _sent_size(operation, parameters) for parameters in seq_of_parameters
+            )
+        return self._cursor.executemany(operation, seq_of_parameters)
+
+    def _fetched(self, started, rows):
+        with self._metrics._lock:
+            values = self._metrics._values
+            values["fetch_seconds"] += time.perf_counter() - started
+            values["rows_fetched"] += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, *args):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(*args)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+
+def install_metrics(engine):
+    """Enable metrics on `engine` and return its :class:`DialectMetrics`."""
+    dialect = engine.dialect
+    if dialect.metrics is not None:
+        return dialect.metrics
+    metrics = dialect.metrics = DialectMetrics()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        context.metrics_execute_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = time.perf_counter() - context.metrics_execute_started
+        with metrics._lock:
+            metrics._values["statements"] += 1
+            metrics._values["execute_seconds"] += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        metrics.add("errors")
+
+    @event.listens_for(engine, "do_connect")
+    def do_connect(dialect, connection_record, cargs, cparams):
+        connection_record.info[_CONNECT_STARTED] = time.perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        started = connection_record.info.pop(_CONNECT_STARTED, None)
+        with metrics._lock:
+            metrics._values["connections"] += 1
+            if started is not None:
+                metrics._values["connect_seconds"] += time.perf_counter() - started
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.add("checkouts")
+
+    return metrics
+
+
+def prometheus_text(metrics, prefix="monetdb_", labels=None):
+    """Render `metrics` in the Prometheus text exposition format."""
+    label_text = ""
+    if labels:
+        label_text = "{%s}" % ",".join(
+            '%s="%s"'
+            % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for k, v in sorted(labels.items())
+        )
+    values = metrics.snapshot()
+    lines = []
+    for name, help_text in COUNTERS:
+        metric = "%s%s_total" % (prefix, name)
+        lines.append("# HELP %s %s" % (metric, help_text))
+        lines.append("# TYPE %s counter" % metric)
+        lines.append("%s%s %s" % (metric, label_text, repr(float(values[name]))))
+    return "\n".join(lines) + "\n"
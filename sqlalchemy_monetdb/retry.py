@@ -0,0 +1,98 @@
+"""
+Retry transactions aborted by MonetDB's optimistic concurrency control.
+
+MonetDB does not block conflicting writers. Instead the transaction that
+loses a write-write conflict is aborted, usually at COMMIT, and the dialect
+raises :class:`~sqlalchemy_monetdb.base.ConcurrencyConflictError`. The
+only remedy is to run the whole transaction again::
+
+    from sqlalchemy_monetdb.retry import RetryStats, run_transaction
+
+    stats = RetryStats()
+
+    def load(conn):
+        conn.execute(batch.insert(), rows)
+
+    run_transaction(engine, load, stats=stats)
+"""
+import random
+import threading
+import time
+
+from sqlalchemy_monetdb.base import ConcurrencyConflictError
+
+
+class RetryStats(object):
+    """Counters kept by :func:`run_transaction`, safe to share between threads.
+
+    transactions
+      number of transactions run, counting each one once
+
+    retries
+      number of times a transaction was run again after a conflict
+
+    exhausted
+      number of transactions that still conflicted after the last attempt
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.transactions = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def _incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "transactions": self.transactions,
+                "retries": self.retries,
+                "exhausted": self.exhausted,
+            }
+
+
+def backoff_delay(attempt, base_delay=0.05, max_delay=2.0):
+    """Return the sleep time before retry number `attempt` (starting at 1).
+
+    Uses "full jitter": a random delay between zero and an exponentially
+    growing cap, so writers that collided do not collide again in lockstep.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+def run_transaction(
+    engine,
+    fn,
+    max_attempts=5,
+    base_delay=0.05,
+    max_delay=2.0,
+    stats=None,
+    sleep=time.sleep,
+):
+    """Run ``fn(connection)`` in a transaction, retrying concurrency conflicts.
+
+    Every attempt runs in a new ``engine.begin()`` block, so `fn` must not
+    have side effects outside the database that cannot be repeated. The
+    return value of the successful attempt is returned. When the last of
+    `max_attempts` attempts conflicts, its
+    :class:`~sqlalchemy_monetdb.base.ConcurrencyConflictError` is raised.
+    """
+    if stats is not None:
+        stats._incr("transactions")
+    attempt = 1
+    while True:
+        try:
+            with engine.begin() as connection:
+                return fn(connection)
+        except ConcurrencyConflictError:
+            if attempt >= max_attempts:
+                if stats is not None:
+                    stats._incr("exhausted")
+                raise
+        if stats is not None:
+            stats._incr("retries")
+        sleep(backoff_delay(attempt, base_delay, max_delay))
+        attempt += 1
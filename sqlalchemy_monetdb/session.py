@@ -0,0 +1,69 @@
+"""
+Session settings of a connection, sent only when they change.
+
+The dialect tracks the schema, role, time zone and optimizer in effect on
+every DBAPI connection. Statements can ask for a value with the
+``monetdb_schema``, ``monetdb_role``, ``monetdb_time_zone`` and
+``monetdb_optimizer`` execution options. The setters below change the
+value the connection goes back to between such statements, until it is
+returned to the pool::
+
+    from sqlalchemy_monetdb.session import set_schema, set_time_zone
+
+    with engine.connect() as conn:
+        set_schema(conn, tenant)
+        set_time_zone(conn, "+02:00")
+        conn.execute(orders.select())
+
+A setter sends nothing by itself: the SET is sent before the next
+statement, and only if the value differs from the one in effect. On
+checkin the pool puts back the settings the session started with, again
+only those that differ.
+
+The ``monetdb_query_timeout`` execution option is tracked the same way.
+It takes seconds, fractions are rounded up. A statement without it runs
+with the session's own timeout again, put back right before it.
+"""
+from sqlalchemy_monetdb.base import SESSION_STATE, time_zone_offset
+
+
+def _set_default(connection, name, value):
+    state = connection.info.setdefault(SESSION_STATE, {})
+    state["default_" + name] = value
+
+
+def set_schema(connection, schema):
+    """Make `schema` the current schema of `connection`."""
+    _set_default(connection, "schema", schema)
+
+
+def set_role(connection, role):
+    """Make `role` the role of `connection`."""
+    _set_default(connection, "role", role)
+
+
+def set_time_zone(connection, time_zone):
+    """Set the time zone of `connection`.
+
+    `time_zone` is a timedelta, a number of seconds east of UTC or a
+    ``"+HH:MM"`` string.
+    """
+    _set_default(connection, "time_zone", time_zone_offset(time_zone))
+
+
+def set_optimizer(connection, optimizer):
+    """Select the optimizer pipeline of `connection`."""
+    _set_default(connection, "optimizer", optimizer)
+
+
+def set_autocommit(connection, autocommit):
+    """Switch `connection` to or from autocommit mode.
+
+    The DBAPI connection is only switched when it is in the other mode.
+    """
+    if autocommit:
+        connection.execution_options(isolation_level="AUTOCOMMIT")
+    else:
+        connection.execution_options(
+            isolation_level=connection.default_isolation_level
+        )
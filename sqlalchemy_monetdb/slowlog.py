@@ -0,0 +1,173 @@
+"""
+Log slow statements to a rotating JSON lines file.
+
+This is an opt-in extension, installed on an engine::
+
+    from sqlalchemy_monetdb.slowlog import SlowQueryLog
+
+    slow_log = SlowQueryLog("slow-queries.jsonl", threshold=0.5, trace=True)
+    slow_log.install(engine)
+
+Every statement taking `threshold` seconds or longer produces one JSON
+object per line with the SQL, its parameters, the row count and the
+duration. With ``trace=True`` slow SELECT statements are run a second time
+under ``TRACE`` and the per-instruction timings are added to the entry.
+
+.. warning::
+
+    Tracing executes the slow statement AGAIN, right after it was found
+    to be slow: the server does the work twice, and anything the query
+    does besides returning rows, e.g. ``NEXT VALUE FOR`` or a function
+    with side effects, happens twice too. Only statements starting with
+    ``SELECT`` or ``WITH`` that returned a result set are traced, never
+    DML, DDL or an ``executemany()``. Leave `trace` off in production
+    unless the slow statements are known to be plain queries.
+
+The trace runs on a connection of its own, opened the way the engine
+opens its connections, in a transaction that is rolled back, so a
+failing trace can't abort the transaction of the application. That
+connection gets the schema, role, time zone and optimizer the dialect
+tracks for the traced one, but it doesn't see uncommitted changes, and
+settings changed by a textual ``SET`` are not carried over. A failed
+trace is logged to the ``sqlalchemy_monetdb.slowlog`` logger.
+"""
+import datetime
+import json
+import logging
+import logging.handlers
+import time
+
+from sqlalchemy import event
+
+from sqlalchemy_monetdb.base import SESSION_STATE, render_session_setting
+
+log = logging.getLogger(__name__)
+
+# tracked session settings the trace connection takes over
+_TRACE_SETTINGS = ("schema", "role", "time_zone", "optimizer")
+
+
+def _redact(parameters):
+    # keep the parameter names and types, drop the values
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact(p) for p in parameters]
+    return type(parameters).__name__
+
+
+class SlowQueryLog(object):
+    """Write statements slower than `threshold` seconds to `path`.
+
+    path
+      the JSON lines file, rotated when it grows over `max_bytes` with
+      `backup_count` old files kept as ``path.1``, ``path.2``, ...
+
+    redact
+      False to log parameter values, True to log only their types, or a
+      callable receiving and returning the parameters
+
+    trace
+      run slow SELECT statements a second time under ``TRACE``, on a
+      connection of their own, and log the timings of their MAL
+      instructions, see the warning above
+    """
+
+    def __init__(
+        self,
+        path,
+        threshold=1.0,
+        redact=False,
+        trace=False,
+        max_bytes=10 * 1024 * 1024,
+        backup_count=5,
+    ):
+        self.threshold = threshold
+        if redact is True:
+            redact = _redact
+        self.redact = redact
+        self.trace = trace
+        self._handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def install(self, engine):
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def remove(self, engine):
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def close(self):
+        self._handler.close()
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        started = getattr(context, "execute_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold:
+            return
+
+        entry = {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "duration_ms": round(elapsed * 1000, 3),
+            "statement": statement,
+            "parameters": self.redact(parameters) if self.redact else parameters,
+            "executemany": executemany,
+            "rowcount": cursor.rowcount,
+        }
+        if (
+            self.trace
+            and not executemany
+            and cursor.description is not None
+            and self._is_select(statement)
+        ):
+            trace = self._trace(conn, context, statement, parameters)
+            if trace is not None:
+                entry["trace"] = trace
+        self.write(entry)
+
+    def _is_select(self, statement):
+        words = statement.split(None, 1)
+        return bool(words) and words[0].upper() in ("SELECT", "WITH")
+
+    def _trace(self, conn, context, statement, parameters):
+        """Return the ``sys.tracelog()`` of `statement`, None if it failed."""
+        info = context._connection_info() or {}
+        state = info.get(SESSION_STATE, {})
+        preparer = conn.dialect.identifier_preparer
+        # like sqlalchemy_monetdb.cancel, a pool of its own so an exhausted
+        # pool doesn't block the trace
+        side_pool = conn.engine.pool.recreate()
+        try:
+            side_connection = side_pool.connect()
+            try:
+                cursor = side_connection.cursor()
+                for name in _TRACE_SETTINGS:
+                    if state.get(name) is not None:
+                        cursor.execute(
+                            render_session_setting(preparer, name, state[name])
+                        )
+                cursor.execute("TRACE " + statement, parameters)
+                cursor.execute("SELECT ticks, stmt FROM sys.tracelog()")
+                return [
+                    {"usec": usec, "statement": stmt}
+                    for usec, stmt in cursor.fetchall()
+                ]
+            finally:
+                # the checkin rolls the transaction back
+                side_connection.close()
+        except Exception:
+            log.warning("TRACE of slow statement failed: %s", statement, exc_info=True)
+            return None
+        finally:
+            side_pool.dispose()
+
+    def write(self, entry):
+        message = json.dumps(entry, default=str)
+        self._handler.handle(
+            logging.makeLogRecord({"msg": message, "levelno": logging.WARNING})
+        )
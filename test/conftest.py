@@ -1,6 +1,7 @@
 from sqlalchemy.dialects import registry
 
 registry.register("monetdb", "sqlalchemy_monetdb.dialect", "MonetDialect")
-#regisry.register("monetdb+lite", "sqlalchemy_monetdb.dialect_lite", "MonetLiteDialect")
+registry.register("monetdb.fake", "sqlalchemy_monetdb.fake", "MonetFakeDialect")
+registry.register("monetdb.monetdbe", "sqlalchemy_monetdb.dialect_monetdbe", "MonetDBEDialect")
 
 from sqlalchemy.testing.plugin.pytestplugin import *
\ No newline at end of file
@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, JSON, MetaData, String, Table, create_engine
+from sqlalchemy import exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises_message
+
+from sqlalchemy_monetdb.bulk import monetdb_insert_values
+from sqlalchemy_monetdb.fake import Catalog
+
+metadata = MetaData()
+events = Table(
+    "events",
+    metadata,
+    Column("id", Integer),
+    Column("name", String(20)),
+    Column("payload", JSON),
+)
+
+
+class InsertValuesTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+
+    def _inserts(self):
+        return [s for s, _ in self.catalog.executed if s.startswith("INSERT")]
+
+    def test_chunks(self):
+        rows = ({"id": i, "name": "n'%d" % i, "payload": [i]} for i in range(100))
+        with self.engine.begin() as conn:
+            eq_(monetdb_insert_values(conn, events, rows, max_statement_bytes=300), 100)
+        inserts = self._inserts()
+        assert len(inserts) > 1
+        for sql in inserts:
+            assert len(sql) <= 300, sql
+        eq_(
+            inserts[0][: inserts[0].index("), (") + 1],
+            'INSERT INTO events (id, "name", payload) VALUES (0, \'n\\\'0\', \'[0]\')',
+        )
+
+    def test_empty_and_missing(self):
+        with self.engine.begin() as conn:
+            eq_(monetdb_insert_values(conn, events, []), 0)
+            assert_raises_message(
+                exc.ArgumentError,
+                "row 1 has no value for column 'name'",
+                monetdb_insert_values,
+                conn,
+                events,
+                [{"id": 1, "name": "a"}, {"id": 2}],
+            )
+        eq_(self._inserts(), [])
@@ -0,0 +1,130 @@
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, func, select
+from sqlalchemy import pool, text
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.cache import ResultCache
+from sqlalchemy_monetdb.fake import Catalog
+
+metadata = MetaData()
+sales = Table("sales", metadata, Column("region", Integer), Column("amount", Integer))
+users = Table("users", metadata, Column("id", Integer))
+orders = Table("orders", metadata, Column("id", Integer), schema="tenant")
+
+
+class ResultCacheTest(fixtures.TestBase):
+    def setup_test(self):
+        self.now = 0.0
+        self.catalog = Catalog()
+        self.catalog.script(r"FROM sales", [(1, 10), (2, 20)], columns=("region", "total"))
+        self.catalog.script(r"FROM users", [(1,)], columns=("id",))
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+        self.cache = ResultCache(max_entries=2, ttl=60, clock=lambda: self.now)
+        self.cache.install(self.engine)
+        self.stmt = (
+            select(sales.c.region, func.sum(sales.c.amount))
+            .group_by(sales.c.region)
+            .execution_options(monetdb_cache=True)
+        )
+
+    def _executions(self, conn, stmt):
+        before = len(self.catalog.executed)
+        rows = conn.execute(stmt).all()
+        expected = [(1, 10), (2, 20)] if sales in stmt.get_final_froms() else [(1,)]
+        eq_([tuple(r) for r in rows], expected)
+        return len(self.catalog.executed) - before
+
+    def test_hit(self):
+        with self.engine.connect() as conn:
+            eq_(self._executions(conn, self.stmt), 1)
+            eq_(self._executions(conn, self.stmt), 0)
+            # without the option the cache is not consulted
+            eq_(conn.execute(self.stmt.execution_options(monetdb_cache=False)).rowcount, 2)
+        eq_((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_dml_invalidates_referenced_tables(self):
+        users_stmt = select(users).execution_options(monetdb_cache=True)
+        with self.engine.connect() as conn:
+            self._executions(conn, self.stmt)
+            self._executions(conn, users_stmt)
+            conn.execute(sales.insert().values(region=3, amount=30))
+            eq_(self._executions(conn, users_stmt), 0)
+            eq_(self._executions(conn, self.stmt), 1)
+
+    def test_ttl_and_size(self):
+        with self.engine.connect() as conn:
+            self._executions(conn, self.stmt)
+            self.now = 61
+            eq_(self._executions(conn, self.stmt), 1)
+            for i in range(2):
+                conn.execute(select(users).where(users.c.id == i).execution_options(monetdb_cache=True))
+            eq_(self._executions(conn, self.stmt), 1)
+
+    def test_schema_translate_map(self):
+        self.catalog.script(r"FROM t1\.orders", [(1,)], columns=("id",))
+        self.catalog.script(r"FROM t2\.orders", [(2,)], columns=("id",))
+        stmt = select(orders).execution_options(monetdb_cache=True)
+        with self.engine.connect() as conn:
+            for tenant, rows in (("t1", [(1,)]), ("t2", [(2,)]), ("t1", [(1,)])):
+                result = conn.execute(
+                    stmt, execution_options={"schema_translate_map": {"tenant": tenant}}
+                )
+                eq_([tuple(r) for r in result], rows)
+        eq_((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_invalidation_by_qualified_name(self):
+        self.catalog.script(r"FROM \w+\.orders", [(1,)], columns=("id",))
+        stmt = select(orders).execution_options(monetdb_cache=True)
+        tenants = [{"schema_translate_map": {"tenant": t}} for t in ("a", "b")]
+        with self.engine.connect() as conn:
+            for options in tenants:
+                conn.execute(stmt, execution_options=options).all()
+            conn.execute(orders.insert().values(id=2), execution_options=tenants[0])
+            for options in tenants:
+                conn.execute(stmt, execution_options=options).all()
+        # the uncommitted a.orders bypasses the cache, b.orders is a hit
+        eq_((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_statements_not_writing(self):
+        with self.engine.connect() as conn:
+            self._executions(conn, self.stmt)
+            conn.execute(text("SAVEPOINT s1"))
+            conn.execute(text("SET TIME ZONE LOCAL"))
+            conn.execute(text("SELECT 1"))
+            eq_(self._executions(conn, self.stmt), 0)
+            conn.execute(text("DELETE FROM sales"))
+            eq_(self._executions(conn, self.stmt), 1)
+
+    def test_uncommitted_changes_not_shared(self):
+        # two connections of the one thread
+        self.engine = create_engine(
+            "monetdb+fake://", catalog=self.catalog, poolclass=pool.QueuePool
+        )
+        self.cache.install(self.engine)
+        with self.engine.connect() as writer, self.engine.connect() as reader:
+            writer.begin()
+            writer.execute(sales.insert().values(region=3, amount=30))
+            # neither stored nor read while the writer's change is pending
+            eq_(self._executions(writer, self.stmt), 1)
+            eq_(len(self.cache._entries), 0)
+            eq_(self._executions(reader, self.stmt), 1)
+            eq_(self._executions(writer, self.stmt), 1)
+            eq_(self._executions(reader, self.stmt), 0)
+            # other tables are still cached for the writer
+            users_stmt = select(users).execution_options(monetdb_cache=True)
+            eq_(self._executions(writer, users_stmt), 1)
+            eq_(self._executions(writer, users_stmt), 0)
+            writer.commit()
+            eq_(self._executions(writer, self.stmt), 1)
+            eq_(self._executions(writer, self.stmt), 0)
+
+    def test_hit_sends_nothing(self):
+        self.catalog.add_schema("tenant")
+        stmt = self.stmt.execution_options(
+            monetdb_schema="tenant", monetdb_prepare=True
+        )
+        with self.engine.connect() as conn:
+            assert self._executions(conn, stmt) > 1
+            # puts the connection's own schema back
+            conn.execute(select(users))
+            eq_(self._executions(conn, stmt), 0)
+        eq_((self.cache.hits, self.cache.misses), (1, 1))
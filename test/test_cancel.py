@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlalchemy import exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises_message
+
+from sqlalchemy_monetdb import fake
+from sqlalchemy_monetdb.cancel import cancel_query, run_cancellable
+from sqlalchemy_monetdb.fake import Catalog
+
+
+class CancelTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.catalog.script(r"FROM sys\.queue\(\)", [(11,), (12,)], columns=("tag",))
+        self.created = 0
+
+        def creator():
+            self.created += 1
+            return fake.connect(self.catalog)
+
+        # no catalog argument: only the creator reaches self.catalog
+        self.engine = create_engine("monetdb+fake://", creator=creator)
+
+    def _sent(self, prefix):
+        return [sql for sql, _ in self.catalog.executed if sql.startswith(prefix)]
+
+    def test_session_id_is_lazy(self):
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            eq_(self._sent("SELECT sys.current_sessionid()"), [])
+            dbapi_connection = conn.connection.dbapi_connection
+            dialect = self.engine.dialect
+            eq_(dialect.get_session_id(dbapi_connection, query=False), None)
+            session_id = dialect.get_session_id(dbapi_connection)
+            eq_(dialect.get_session_id(dbapi_connection), session_id)
+            eq_(dialect.get_session_id(dbapi_connection, query=False), session_id)
+        eq_(len(self._sent("SELECT sys.current_sessionid()")), 1)
+
+    def test_cancel_query(self):
+        with self.engine.connect() as conn:
+            session_id = self.engine.dialect.get_session_id(
+                conn.connection.dbapi_connection
+            )
+            eq_(cancel_query(self.engine, conn), 2)
+        eq_(
+            self._sent("SELECT tag"),
+            [
+                "SELECT tag FROM sys.queue() "
+                "WHERE sessionid = %d AND status = 'running'" % session_id
+            ],
+        )
+        eq_(self._sent("CALL sys.stop"), ["CALL sys.stop(11)", "CALL sys.stop(12)"])
+        # the side connection came from the engine's creator
+        eq_(self.created, 2)
+
+    def test_unknown_session_id(self):
+        with self.engine.connect() as conn:
+            assert_raises_message(
+                exc.InvalidRequestError,
+                "session id of this connection is unknown",
+                cancel_query,
+                self.engine,
+                conn,
+            )
+        eq_(self._sent("CALL"), [])
+
+    def test_run_cancellable(self):
+        started = threading.Event()
+        stopped = threading.Event()
+
+        def slow(parameters):
+            started.set()
+            stopped.wait(5)
+            raise fake.OperationalError("Query aborted")
+
+        def stop(parameters):
+            stopped.set()
+            return []
+
+        self.catalog.script(r"FROM slow", slow)
+        self.catalog.script(r"CALL sys\.stop", stop)
+
+        async def main():
+            task = asyncio.ensure_future(
+                run_cancellable(
+                    self.engine, lambda conn: conn.execute(text("SELECT * FROM slow"))
+                )
+            )
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return "cancelled"
+
+        eq_(asyncio.run(main()), "cancelled")
+        assert stopped.is_set()
+        eq_(self._sent("CALL sys.stop"), ["CALL sys.stop(11)", "CALL sys.stop(12)"])
+
+    def test_run_cancellable_result(self):
+        self.catalog.script(r"^SELECT 1$", [(1,)])
+        rows = asyncio.run(
+            run_cancellable(
+                self.engine, lambda conn: conn.execute(text("SELECT 1")).fetchall()
+            )
+        )
+        eq_(rows, [(1,)])
+        eq_(self._sent("CALL"), [])
@@ -0,0 +1,87 @@
+from sqlalchemy import MetaData, Table, Column, Integer, Sequence
+from sqlalchemy import create_engine, text
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.base import CATALOG_SNAPSHOT
+from sqlalchemy_monetdb.fake import Catalog
+
+
+class CatalogSnapshotTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog(version="11.49.9")
+        self.catalog.add_table("parent", [("id", "int")])
+        self.catalog.add_table("child", [("id", "int")])
+        self.catalog.add_table("other", [("id", "int")], schema="tenant")
+        self.catalog.add_sequence("counter")
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+
+    def _snapshots(self):
+        return sum("AS kind" in sql for sql, _ in self.catalog.executed)
+
+    def _probes(self):
+        return sum(
+            "FROM sys.tables, sys.schemas" in sql or "FROM sys.sequences" in sql
+            for sql, _ in self.catalog.executed
+        )
+
+    def test_initialize(self):
+        # initialize() runs on an ad-hoc connection without connection.info
+        with self.engine.connect():
+            pass
+        eq_(self.engine.dialect.server_version_info, (11, 49, 9))
+        eq_(self.engine.dialect.default_schema_name, "sys")
+
+    def test_probes_reuse_snapshot(self):
+        dialect = self.engine.dialect
+        with self.engine.begin() as conn:
+            assert dialect.has_table(conn, "parent")
+            assert dialect.has_table(conn, "child")
+            assert not dialect.has_table(conn, "missing")
+            assert dialect.has_sequence(conn, "counter")
+            eq_(self._snapshots(), 1)
+            assert dialect.has_table(conn, "other", schema="tenant")
+            assert not dialect.has_table(conn, "parent", schema="tenant")
+            eq_(self._snapshots(), 2)
+            assert CATALOG_SNAPSHOT in conn.info
+        eq_(self._probes(), 2)
+
+    def test_statement_invalidates_snapshot(self):
+        dialect = self.engine.dialect
+        with self.engine.begin() as conn:
+            assert dialect.has_table(conn, "parent")
+            conn.execute(text("SELECT 1"))
+            assert CATALOG_SNAPSHOT not in conn.info
+            assert dialect.has_table(conn, "child")
+        eq_(self._snapshots(), 2)
+
+    def test_new_transaction_new_snapshot(self):
+        dialect = self.engine.dialect
+        with self.engine.connect() as conn:
+            with conn.begin():
+                assert dialect.has_table(conn, "parent")
+            with conn.begin():
+                assert dialect.has_table(conn, "parent")
+        eq_(self._snapshots(), 2)
+
+    def test_autocommit_probes(self):
+        dialect = self.engine.dialect
+        with self.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            assert dialect.has_table(conn, "parent")
+            assert dialect.has_table(conn, "child")
+        eq_(self._snapshots(), 0)
+        eq_(self._probes(), 2)
+
+    def test_create_all(self):
+        metadata = MetaData()
+        for name in ("parent", "child", "new"):
+            Table(name, metadata, Column("id", Integer))
+        Sequence("counter", metadata=metadata)
+        metadata.create_all(self.engine)
+        eq_(self._snapshots(), 1)
+        created = [
+            sql for sql, _ in self.catalog.executed if sql.lstrip().startswith("CREATE")
+        ]
+        eq_(len(created), 1)
+        assert "new" in created[0]
@@ -0,0 +1,71 @@
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine
+from sqlalchemy import delete, func, select
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.fake import Catalog
+
+metadata = MetaData()
+items = Table("items", metadata, Column("id", Integer), Column("name", String(20)))
+
+
+class StatementSizeTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.catalog.script(
+            r"^SELECT items\.id",
+            lambda parameters: [
+                (v,) for k, v in sorted(parameters.items()) if k.startswith("id")
+            ],
+            columns=("id",),
+        )
+        self.engine = create_engine(
+            "monetdb+fake://", catalog=self.catalog, max_statement_size=200
+        )
+
+    def _sent(self, start):
+        return [
+            (sql, parameters)
+            for sql, parameters in self.catalog.executed
+            if sql.startswith(start)
+        ]
+
+    def test_multi_row_insert(self):
+        rows = [{"id": i, "name": "n%d" % i} for i in range(30)]
+        with self.engine.begin() as conn:
+            eq_(conn.execute(items.insert().values(rows)).rowcount, 30)
+        sent = self._sent("INSERT")
+        assert len(sent) > 1
+        eq_(sum(len(parameters) for _, parameters in sent), 60)
+        eq_(
+            sent[0][0][: sent[0][0].index("), (") + 1],
+            'INSERT INTO items (id, "name") VALUES (:id_m0, :name_m0)',
+        )
+
+    def test_in_list(self):
+        stmt = select(items.c.id).where(
+            items.c.id.in_(list(range(40)) + [3]), items.c.name == "x"
+        )
+        with self.engine.connect() as conn:
+            eq_(sorted(conn.execute(stmt).scalars()), list(range(40)))
+            eq_(conn.execute(delete(items).where(items.c.id.in_(range(50)))).rowcount, 0)
+        selects = self._sent("SELECT items.id")
+        assert len(selects) > 1
+        for sql, parameters in selects:
+            assert sql.endswith('AND items."name" = :name_1'), sql
+            eq_(parameters["name_1"], "x")
+        assert len(self._sent("DELETE")) > 1
+
+    def test_not_split(self):
+        # splitting would change the result of aggregates
+        stmt = select(func.count()).where(items.c.id.in_(range(50)))
+        with self.engine.connect() as conn:
+            conn.execute(stmt)
+        eq_(len(self._sent("SELECT count(*)")), 1)
+        # so would it for a row limit
+        for limited in (
+            select(items.c.id).where(items.c.id.in_(range(60))).limit(5),
+            select(items.c.id).where(items.c.id.in_(range(60))).fetch(5),
+        ):
+            with self.engine.connect() as conn:
+                conn.execute(limited)
+        eq_(len(self._sent("SELECT items.id")), 2)
@@ -0,0 +1,56 @@
+import numpy
+
+from sqlalchemy import exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb.columnar import monetdb_columns
+
+
+class FakeCursor(object):
+    def __init__(self, description, arrays):
+        self.description = description
+        self.arrays = arrays
+
+    def fetchnumpy(self):
+        return self.arrays
+
+
+class FakeResult(object):
+    closed = False
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def close(self):
+        self.closed = True
+
+
+class ColumnarTest(fixtures.TestBase):
+    def test_columns(self):
+        ids = numpy.ma.masked_array(
+            numpy.array([1, 2, -(2**31)], dtype=numpy.int32),
+            mask=[False, False, True],
+        )
+        names = numpy.ma.masked_array(
+            numpy.array(["a", "b", "None"]), mask=[False, False, True]
+        )
+        days = numpy.ma.masked_array(
+            numpy.array(["2024-01-01", "2024-01-02", "2024-01-03"], dtype=object)
+        )
+        result = FakeResult(
+            FakeCursor(
+                [("id", "int"), ("name", "string"), ("day", "date")],
+                {"id": ids, "name": names, "day": days},
+            )
+        )
+        columns = monetdb_columns(result)
+        assert result.closed
+        # numeric columns are handed through without a copy
+        assert numpy.shares_memory(columns["id"], ids)
+        eq_(columns["id"].mask.tolist(), [False, False, True])
+        eq_(columns["name"].compressed().tolist(), ["a", "b"])
+        eq_(columns["day"].dtype, numpy.dtype("datetime64[D]"))
+
+    def test_requires_monetdbe(self):
+        result = FakeResult(object())
+        assert_raises(exc.InvalidRequestError, monetdb_columns, result)
@@ -0,0 +1,134 @@
+from sqlalchemy import BigInteger, Column, Integer, MetaData, Sequence, Table
+from sqlalchemy import bindparam, column, select
+from sqlalchemy import exc
+from sqlalchemy.schema import CreateSequence, CreateTable
+from sqlalchemy.testing import fixtures, AssertsCompiledSQL, assert_raises_message, eq_
+
+from sqlalchemy_monetdb.compiler import BoundedMemo
+from sqlalchemy_monetdb.ddl import AlterTableAddTable, AlterTableDropTable
+from sqlalchemy_monetdb.dialect import MonetDialect
+
+
+class DDLCompilerTest(fixtures.TestBase, AssertsCompiledSQL):
+    __dialect__ = MonetDialect()
+
+    def _table(self, name, **kw):
+        return Table(name, MetaData(), Column("id", Integer), **kw)
+
+    def test_create_merge_table(self):
+        self.assert_compile(
+            CreateTable(self._table("t", monetdb_merge=True)),
+            "CREATE MERGE TABLE t (id INTEGER)",
+        )
+
+    def test_create_replica_table(self):
+        self.assert_compile(
+            CreateTable(self._table("t", monetdb_replica=True)),
+            "CREATE REPLICA TABLE t (id INTEGER)",
+        )
+
+    def test_create_unlogged_table(self):
+        self.assert_compile(
+            CreateTable(self._table("t", monetdb_unlogged=True)),
+            "CREATE UNLOGGED TABLE t (id INTEGER)",
+        )
+
+    def test_create_remote_table(self):
+        self.assert_compile(
+            CreateTable(
+                self._table("t", monetdb_remote="mapi:monetdb://node1:50000/db/sys/t")
+            ),
+            "CREATE REMOTE TABLE t (id INTEGER) "
+            "ON 'mapi:monetdb://node1:50000/db/sys/t'",
+        )
+
+    def test_create_remote_table_credentials(self):
+        self.assert_compile(
+            CreateTable(
+                self._table(
+                    "t",
+                    monetdb_remote="mapi:monetdb://node1:50000/db",
+                    monetdb_remote_user="monetdb",
+                    monetdb_remote_password="it's secret",
+                )
+            ),
+            "CREATE REMOTE TABLE t (id INTEGER) "
+            "ON 'mapi:monetdb://node1:50000/db' "
+            "WITH USER 'monetdb' PASSWORD 'it''s secret'",
+        )
+
+    def test_conflicting_table_kinds(self):
+        assert_raises_message(
+            exc.CompileError,
+            "can only be one of MERGE TABLE or REPLICA TABLE",
+            CreateTable(
+                self._table("t", monetdb_merge=True, monetdb_replica=True)
+            ).compile,
+            dialect=self.__dialect__,
+        )
+
+    def test_alter_merge_table_members(self):
+        merged = self._table("merged", monetdb_merge=True)
+        part = self._table("part", schema="s1")
+        self.assert_compile(
+            AlterTableAddTable(merged, part), "ALTER TABLE merged ADD TABLE s1.part"
+        )
+        self.assert_compile(
+            AlterTableDropTable(merged, part), "ALTER TABLE merged DROP TABLE s1.part"
+        )
+
+    def test_create_sequence(self):
+        self.assert_compile(
+            CreateSequence(Sequence("s", start=1, increment=2)),
+            "CREATE SEQUENCE s AS INTEGER START WITH 1 INCREMENT BY 2",
+        )
+
+    def test_create_sequence_all_options(self):
+        self.assert_compile(
+            CreateSequence(
+                Sequence(
+                    "s",
+                    data_type=BigInteger,
+                    start=10,
+                    increment=5,
+                    minvalue=1,
+                    maxvalue=9000000000,
+                    cache=50,
+                    cycle=True,
+                )
+            ),
+            "CREATE SEQUENCE s AS BIGINT START WITH 10 INCREMENT BY 5 "
+            "MINVALUE 1 MAXVALUE 9000000000 CACHE 50 CYCLE",
+        )
+
+    def test_create_sequence_no_bounds(self):
+        self.assert_compile(
+            CreateSequence(
+                Sequence("s", nominvalue=True, nomaxvalue=True, cycle=False)
+            ),
+            "CREATE SEQUENCE s AS INTEGER NO MINVALUE NO MAXVALUE NO CYCLE",
+        )
+
+
+class BindNameTest(fixtures.TestBase, AssertsCompiledSQL):
+    __dialect__ = MonetDialect()
+
+    def test_escaped_bind_names(self):
+        stmt = select(column("q")).where(
+            column("q").in_(bindparam("_y", [1, 2], expanding=True)),
+            column("r").in_(bindparam("a b", [3], expanding=True)),
+            column("s") == bindparam("select", 4),
+        )
+        for _ in range(2):
+            # the second compile is served from the memos
+            self.assert_compile(
+                stmt,
+                "SELECT q WHERE q IN (:D_y_1, :D_y_2) AND r IN (:aCb_1) "
+                'AND s = :"select"',
+                render_postcompile=True,
+            )
+
+    def test_bounded_memo(self):
+        memo = BoundedMemo(str.upper, size=2)
+        eq_([memo["a"], memo["b"], memo["c"]], ["A", "B", "C"])
+        eq_(sorted(memo), ["c"])
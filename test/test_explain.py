@@ -0,0 +1,94 @@
+from sqlalchemy import MetaData, Table, Column, Integer, String
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.explain import (
+    Trace,
+    TraceInstruction,
+    monetdb_explain,
+    monetdb_plan,
+    monetdb_trace,
+)
+from sqlalchemy_monetdb.fake import Catalog
+
+
+class ExplainTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+        self.users = Table(
+            "users",
+            MetaData(),
+            Column("id", Integer),
+            Column("name", String(20)),
+        )
+
+    def _sent(self, prefix):
+        return [
+            (sql, parameters)
+            for sql, parameters in self.catalog.executed
+            if sql.startswith(prefix)
+        ]
+
+    def test_explain(self):
+        program = [
+            "function user.main():void;",
+            "    X_1 := sql.mvc();",
+            "end user.main;",
+        ]
+        self.catalog.script(
+            r"^EXPLAIN ", [(line,) for line in program], columns=("mal",)
+        )
+        stmt = select(self.users.c.name).where(self.users.c.id == 5)
+        with self.engine.connect() as conn:
+            eq_(monetdb_explain(conn, stmt), program)
+        ((sql, parameters),) = self._sent("EXPLAIN")
+        eq_(
+            sql,
+            'EXPLAIN SELECT users."name" \nFROM users \nWHERE users.id = :id_1',
+        )
+        eq_(parameters, {"id_1": 5})
+
+    def test_plan_text(self):
+        plan = ["project (", "| table(sys.users)", ") [ users.name ]"]
+        self.catalog.script(r"^PLAN ", [(line,) for line in plan], columns=("rel",))
+        with self.engine.connect() as conn:
+            eq_(
+                monetdb_plan(conn, "SELECT name FROM users WHERE id = :id", {"id": 3}),
+                plan,
+            )
+        eq_(
+            self._sent("PLAN"),
+            [("PLAN SELECT name FROM users WHERE id = :id", {"id": 3})],
+        )
+
+    def test_trace(self):
+        self.catalog.script(r"^TRACE ", [("alice",), ("bob",)], columns=("name",))
+        self.catalog.script(
+            r"FROM sys\.tracelog\(\)",
+            [(12, "X_1 := sql.mvc();"), (340, "X_5 := algebra.select(X_4);")],
+            columns=("ticks", "stmt"),
+        )
+        with self.engine.connect() as conn:
+            trace = monetdb_trace(conn, select(self.users.c.name))
+        assert isinstance(trace, Trace)
+        eq_([tuple(row) for row in trace.rows], [("alice",), ("bob",)])
+        eq_(
+            trace.instructions,
+            [
+                TraceInstruction(12, "X_1 := sql.mvc();"),
+                TraceInstruction(340, "X_5 := algebra.select(X_4);"),
+            ],
+        )
+        eq_(max(trace.instructions).usec, 340)
+        eq_(
+            [sql for sql, _ in self._sent("TRACE")],
+            ['TRACE SELECT users."name" \nFROM users'],
+        )
+
+    def test_trace_dml(self):
+        self.catalog.script(r"^TRACE INSERT", [])
+        self.catalog.script(r"FROM sys\.tracelog\(\)", [], columns=("ticks", "stmt"))
+        with self.engine.begin() as conn:
+            trace = monetdb_trace(conn, self.users.insert().values(id=1, name="x"))
+        eq_(trace, Trace([], []))
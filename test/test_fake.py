@@ -0,0 +1,51 @@
+from sqlalchemy import MetaData, Table, create_engine, inspect, text
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.fake import Catalog
+
+
+class FakeDBAPITest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.catalog.add_table(
+            "parent",
+            [("id", "int", 32, 0, False), ("name", "varchar", 40)],
+            primary_key=["id"],
+            unique={"parent_name_unique": ["name"]},
+        )
+        self.catalog.add_table(
+            "child",
+            [("id", "int"), ("parent_id", "int")],
+            primary_key=["id"],
+            foreign_keys=[("child_parent_fk", ["parent_id"], None, "parent", ["id"])],
+            indexes={"child_parent_idx": ["parent_id"]},
+        )
+        self.catalog.add_view("names", [("name", "varchar", 40)], "select name from parent")
+        self.catalog.add_sequence("counter", start=10)
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+
+    def test_names(self):
+        insp = inspect(self.engine)
+        eq_(sorted(insp.get_table_names()), ["child", "parent"])
+        eq_(insp.get_view_names(), ["names"])
+        eq_(insp.get_sequence_names(), ["counter"])
+        assert insp.has_table("parent")
+        assert not insp.has_table("missing")
+
+    def test_reflect_table(self):
+        metadata = MetaData()
+        child = Table("child", metadata, autoload_with=self.engine)
+        parent = metadata.tables["parent"]
+        eq_([c.name for c in parent.primary_key], ["id"])
+        eq_(parent.c.name.type.length, 40)
+        assert not parent.c.id.nullable
+        fk = list(child.foreign_keys)[0]
+        eq_(fk.target_fullname, "parent.id")
+        eq_([i.name for i in child.indexes], ["child_parent_idx"])
+
+    def test_scripted_response(self):
+        self.catalog.script(r"FROM parent", [(1, "a"), (2, "b")], columns=("id", "name"))
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT id, name FROM parent")).all()
+        eq_([tuple(r) for r in rows], [(1, "a"), (2, "b")])
+        eq_(self.catalog.executed[-1][0], "SELECT id, name FROM parent")
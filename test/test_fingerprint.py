@@ -0,0 +1,51 @@
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.fingerprint import StatementStats, fingerprint
+
+
+class FingerprintTest(fixtures.TestBase):
+    def test_literals_and_binds(self):
+        eq_(
+            fingerprint(
+                "SELECT t.id, \"c 1\" \nFROM t \nWHERE t.id = :id_1 "
+                "AND name = 'it''s' AND x > 3.5e2 AND t1.y = -4"
+            ),
+            "SELECT t.id, \"c 1\" FROM t WHERE t.id = ? "
+            "AND name = ? AND x > ? AND t1.y = ?",
+        )
+
+    def test_in_lists(self):
+        eq_(
+            fingerprint("SELECT a FROM t WHERE a IN (:a_1_1, :a_1_2, :a_1_3)"),
+            fingerprint("SELECT a FROM t WHERE a IN ( 1 )"),
+        )
+
+    def test_multi_values(self):
+        eq_(
+            fingerprint('INSERT INTO t (a, "b") VALUES (:a_m0, :"b_m0"), (:a_m1, :"b_m1")'),
+            'INSERT INTO t (a, "b") VALUES (...)',
+        )
+
+
+class StatementStatsTest(fixtures.TestBase):
+    def test_aggregate(self):
+        stats = StatementStats()
+        stats.record("SELECT a FROM t WHERE a = 1", 0.010, rows=1)
+        stats.record("SELECT a FROM t WHERE a = 2", 0.030, rows=2)
+        (entry,) = stats.entries()
+        eq_(entry["fingerprint"], "SELECT a FROM t WHERE a = ?")
+        eq_(entry["calls"], 2)
+        eq_(entry["rows"], 3)
+        eq_(round(entry["mean_ms"]), 20)
+        eq_(round(entry["p95_ms"]), 30)
+
+    def test_lru_eviction(self):
+        stats = StatementStats(max_entries=2)
+        stats.record("SELECT a FROM t", 0.1)
+        stats.record("SELECT b FROM t", 0.1)
+        stats.record("SELECT a FROM t", 0.1)
+        stats.record("SELECT c FROM t", 0.1)
+        eq_(
+            sorted(e["fingerprint"] for e in stats.entries()),
+            ["SELECT a FROM t", "SELECT c FROM t"],
+        )
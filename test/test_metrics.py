@@ -0,0 +1,131 @@
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.testing import fixtures, eq_, assert_raises
+
+from sqlalchemy_monetdb import fake
+from sqlalchemy_monetdb.fake import Catalog
+from sqlalchemy_monetdb.metrics import (
+    DialectMetrics,
+    MeteredCursor,
+    install_metrics,
+    prometheus_text,
+)
+
+
+class FakeCursor(object):
+    description = [("id",)]
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.executed = []
+
+    def execute(self, operation, parameters=None):
+        self.executed.append((operation, parameters))
+
+    def executemany(self, operation, seq_of_parameters):
+        for parameters in seq_of_parameters:
+            self.execute(operation, parameters)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
+class MetricsTest(fixtures.TestBase):
+    def test_metered_cursor_counts_rows(self):
+        metrics = DialectMetrics()
+        cursor = MeteredCursor(FakeCursor([(1,), (2,), (3,), (4,)]), metrics)
+        eq_(cursor.description, [("id",)])
+        eq_(cursor.fetchone(), (1,))
+        eq_(cursor.fetchmany(2), [(2,), (3,)])
+        eq_(cursor.fetchall(), [(4,)])
+        eq_(cursor.fetchone(), None)
+        eq_(metrics.snapshot()["rows_fetched"], 4)
+
+    def test_metered_cursor_counts_statements(self):
+        metrics = DialectMetrics()
+        cursor = MeteredCursor(FakeCursor([]), metrics)
+        cursor.execute("SELECT 1")
+        cursor.execute("SELECT %(x)s", {"x": "é"})
+        cursor.executemany("INSERT INTO t VALUES (%s)", iter([(1,), (22,)]))
+        eq_(len(cursor.executed), 4)
+        values = metrics.snapshot()
+        eq_(values["round_trips"], 4)
+        # SQL text plus the literals 'é', 1 and 22
+        insert = len("INSERT INTO t VALUES (%s)")
+        eq_(values["bytes_sent"], 8 + 12 + 4 + 2 * insert + 1 + 2)
+
+    def test_prometheus_text(self):
+        metrics = DialectMetrics()
+        metrics.add("statements", 3)
+        text = prometheus_text(metrics, labels={"engine": 'a"b'})
+        assert "# TYPE monetdb_statements_total counter\n" in text
+        assert 'monetdb_statements_total{engine="a\\"b"} 3.0\n' in text
+
+    def test_reset(self):
+        metrics = DialectMetrics()
+        metrics.add("round_trips")
+        metrics.reset()
+        eq_(metrics.snapshot()["round_trips"], 0)
+
+    def test_install_survives_dispose(self):
+        catalog = Catalog()
+        catalog.script(r"^SELECT 1$", [(1,)])
+        engine = create_engine("monetdb+fake://", catalog=catalog)
+        metrics = install_metrics(engine)
+        assert install_metrics(engine) is metrics
+        with engine.connect() as conn:
+            eq_(conn.execute(text("SELECT 1")).fetchall(), [(1,)])
+        values = metrics.snapshot()
+        eq_(
+            (values["statements"], values["connections"], values["checkouts"]),
+            (1, 1, 1),
+        )
+        assert values["round_trips"] >= 1
+        assert values["bytes_sent"] >= len("SELECT 1")
+        assert values["connect_seconds"] > 0
+        assert values["compile_seconds"] > 0
+        assert values["execute_seconds"] > 0
+
+        engine.dispose()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        after = metrics.snapshot()
+        eq_((after["statements"], after["connections"]), (2, 2))
+        assert after["connect_seconds"] > values["connect_seconds"]
+
+    def test_errors(self):
+        def fail(parameters):
+            raise fake.OperationalError("no such table")
+
+        catalog = Catalog()
+        catalog.script(r"FROM missing", fail)
+        engine = create_engine("monetdb+fake://", catalog=catalog)
+        metrics = install_metrics(engine)
+        with engine.connect() as conn:
+            assert_raises(
+                exc.OperationalError, conn.execute, text("SELECT * FROM missing")
+            )
+        values = metrics.snapshot()
+        eq_((values["errors"], values["statements"]), (1, 0))
+
+    def test_side_statements(self):
+        # the session SETs and PREPAREs of the dialect are round trips too
+        catalog = Catalog()
+        catalog.add_schema("tenant")
+        engine = create_engine("monetdb+fake://", catalog=catalog)
+        metrics = install_metrics(engine)
+        with engine.connect() as conn:
+            before = metrics.snapshot()["round_trips"]
+            conn.execute(
+                text("SELECT 1"),
+                execution_options={"monetdb_schema": "tenant", "monetdb_prepare": True},
+            )
+        # SELECT current_schema, SET SCHEMA, PREPARE and EXEC
+        eq_(metrics.snapshot()["round_trips"] - before, 4)
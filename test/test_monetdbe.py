@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy import column, create_engine, func, inspect, pool, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.testing import fixtures, eq_
+from sqlalchemy.testing import AssertsCompiledSQL
+
+from sqlalchemy_monetdb import fake
+from sqlalchemy_monetdb.dialect_monetdbe import MonetDBEDialect
+
+try:
+    import monetdbe
+except ImportError:
+    monetdbe = None
+
+
+class MonetDBEDialectTest(fixtures.TestBase, AssertsCompiledSQL):
+    __dialect__ = MonetDBEDialect()
+
+    def _connect_args(self, url):
+        return MonetDBEDialect().create_connect_args(make_url(url))
+
+    def test_memory_database(self):
+        expected = ([], {"database": ":memory:", "autocommit": False})
+        eq_(self._connect_args("monetdb+monetdbe://"), expected)
+        eq_(self._connect_args("monetdb+monetdbe:///:memory:"), expected)
+
+    def test_database_directory(self):
+        args = self._connect_args(
+            "monetdb+monetdbe:////data/farm?nr_threads=4&memorylimit=512"
+        )
+        eq_(
+            args,
+            (
+                [],
+                {
+                    "database": "/data/farm",
+                    "autocommit": False,
+                    "nr_threads": 4,
+                    "memorylimit": 512,
+                },
+            ),
+        )
+
+    def test_mod_is_not_escaped(self):
+        self.assert_compile(column("x") % 3, "x % :x_1")
+
+    def test_isolation_level(self):
+        engine = create_engine("monetdb+monetdbe://", module=fake)
+        with engine.connect() as conn:
+            eq_(conn.get_isolation_level(), "SERIALIZABLE")
+            conn.execution_options(isolation_level="AUTOCOMMIT")
+            eq_(conn.get_isolation_level(), "AUTOCOMMIT")
+            assert engine.dialect._is_autocommit(conn.connection)
+
+
+class MonetDBEPoolTest(fixtures.TestBase):
+    def _dbapi_connections(self, url):
+        # the DBAPI connection each of two threads gets from the engine
+        engine = create_engine(url, module=fake)
+        connections = []
+
+        def use():
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                connections.append(conn.connection.dbapi_connection)
+
+        for _ in range(2):
+            thread = threading.Thread(target=use)
+            thread.start()
+            thread.join()
+        return engine, connections
+
+    def test_connection_per_thread(self):
+        for url in ("monetdb+monetdbe://", "monetdb+monetdbe:////data/farm"):
+            engine, (first, second) = self._dbapi_connections(url)
+            assert isinstance(engine.pool, pool.SingletonThreadPool)
+            assert first is not second
+
+    def test_same_thread_same_connection(self):
+        engine = create_engine("monetdb+monetdbe://", module=fake)
+        with engine.connect() as conn:
+            first = conn.connection.dbapi_connection
+        with engine.connect() as conn:
+            assert conn.connection.dbapi_connection is first
+
+
+@pytest.mark.skipif(monetdbe is None, reason="monetdbe is not installed")
+class MonetDBERoundTripTest(fixtures.TestBase):
+    """Against a real embedded in-memory database."""
+
+    def setup_test(self):
+        self.engine = create_engine("monetdb+monetdbe://")
+        self.metadata = MetaData()
+        self.users = Table(
+            "users",
+            self.metadata,
+            Column("id", Integer, primary_key=True, autoincrement=False),
+            Column("name", String(20)),
+        )
+        self.metadata.create_all(self.engine)
+
+    def teardown_test(self):
+        self.engine.dispose()
+
+    def test_insert_select(self):
+        with self.engine.begin() as conn:
+            conn.execute(
+                self.users.insert(), [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+            )
+        stmt = select(self.users.c.name).where(self.users.c.id % 2 == 0)
+        with self.engine.connect() as conn:
+            eq_(conn.execute(stmt).scalars().all(), ["b"])
+
+    def test_rollback(self):
+        with self.engine.connect() as conn:
+            with conn.begin() as trans:
+                conn.execute(self.users.insert().values(id=1, name="a"))
+                trans.rollback()
+            eq_(conn.execute(select(func.count()).select_from(self.users)).scalar(), 0)
+
+    def test_autocommit(self):
+        with self.engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT")
+            eq_(conn.get_isolation_level(), "AUTOCOMMIT")
+            conn.execute(self.users.insert().values(id=1, name="a"))
+        with self.engine.connect() as conn:
+            eq_(conn.get_isolation_level(), "SERIALIZABLE")
+            eq_(conn.execute(select(self.users.c.name)).scalars().all(), ["a"])
+
+    def test_reflection(self):
+        inspector = inspect(self.engine)
+        eq_([c["name"] for c in inspector.get_columns("users")], ["id", "name"])
+        eq_(inspector.get_pk_constraint("users")["constrained_columns"], ["id"])
@@ -0,0 +1,114 @@
+import datetime
+import decimal
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    literal_column,
+    select,
+    text,
+)
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.compiler import ParameterTemplate, sql_literal
+from sqlalchemy_monetdb.fake import Catalog
+
+metadata = MetaData()
+users = Table(
+    "users", metadata, Column("id", Integer), Column("name", String(20))
+)
+
+
+class PreparedStatementTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.catalog.script(r"FROM users", [(1, "x")], columns=("id", "name"))
+        self.engine = create_engine(
+            "monetdb+fake://", catalog=self.catalog, prepared_statement_cache_size=2
+        ).execution_options(monetdb_prepare=True)
+
+    def _sent(self):
+        return [s for s, _ in self.catalog.executed]
+
+    def test_prepare_once_exec_by_id(self):
+        stmt = select(users).where(
+            users.c.name == "it's :x",
+            users.c.id == 5,
+            users.c.name != literal_column("'12:30'"),
+        )
+        with self.engine.connect() as conn:
+            self.catalog.executed.clear()
+            eq_(conn.execute(stmt).all(), [(1, "x")])
+            eq_(conn.execute(stmt).all(), [(1, "x")])
+        prepare, first, second = self._sent()[:3]
+        assert prepare.startswith("PREPARE SELECT")
+        assert """users."name" = ? AND users.id = ? AND users."name" <> '12:30'""" in prepare
+        eq_(first, "EXEC 1('it\\'s :x', 5)")
+        eq_(second, first)
+
+    def test_eviction_deallocates(self):
+        with self.engine.connect() as conn:
+            for stmt in (select(users.c.id), select(users.c.name), select(users)):
+                conn.execute(stmt.where(users.c.id == 1))
+        assert "DEALLOCATE PREPARE 1" in self._sent()
+        eq_(sorted(self.catalog.prepared), [2, 3])
+
+    def test_ddl_deallocates_all(self):
+        with self.engine.connect() as conn:
+            conn.execute(select(users))
+            metadata.create_all(conn, checkfirst=False)
+        assert "DEALLOCATE PREPARE ALL" in self._sent()
+        eq_(self.catalog.prepared, {})
+
+    def test_textual_ddl_and_set_deallocate_all(self):
+        self.catalog.add_schema("tenant")
+        stmt = select(users).where(users.c.id == 1)
+        for change in (
+            lambda conn: conn.execute(text("CREATE TABLE t (x INT)")),
+            lambda conn: conn.exec_driver_sql("DROP TABLE t"),
+            lambda conn: conn.execute(text("SET SCHEMA tenant")),
+        ):
+            with self.engine.connect() as conn:
+                conn.execute(stmt)
+                self.catalog.executed.clear()
+                change(conn)
+                conn.execute(stmt)
+            sent = self._sent()
+            eq_(sent[0], "DEALLOCATE PREPARE ALL")
+            eq_(sum(sql.startswith("PREPARE SELECT") for sql in sent), 1)
+            eq_(len(self.catalog.prepared), 1)
+
+    def test_other_textual_statements_keep_plans(self):
+        stmt = select(users).where(users.c.id == 1)
+        with self.engine.connect() as conn:
+            conn.execute(stmt)
+            conn.exec_driver_sql("CALL sys.setquerytimeout(5)")
+            conn.exec_driver_sql("INSERT INTO users VALUES (2, 'y')")
+            conn.execute(stmt)
+        sent = self._sent()
+        eq_(sum(sql.startswith("PREPARE SELECT") for sql in sent), 1)
+        assert "DEALLOCATE PREPARE ALL" not in sent
+
+
+class ParameterTemplateTest(fixtures.TestBase):
+    def test_template(self):
+        template = ParameterTemplate(
+            """SELECT ':a', "b:c" FROM t WHERE x = :x AND "table" = :"table\""""
+        )
+        eq_(template.names, ["x", '"table"'])
+        eq_(
+            template.placeholders(),
+            """SELECT ':a', "b:c" FROM t WHERE x = ? AND "table" = ?""",
+        )
+
+    def test_literals(self):
+        eq_(sql_literal(5), "5")
+        eq_(sql_literal(True), "true")
+        eq_(sql_literal(1.5), "1.5")
+        eq_(sql_literal(decimal.Decimal("1.10")), "1.10")
+        eq_(sql_literal("a\\b"), "'a\\\\b'")
+        eq_(sql_literal(datetime.date(2024, 1, 2)), "DATE '2024-01-02'")
@@ -0,0 +1,146 @@
+import contextlib
+
+from sqlalchemy import create_engine, text
+from sqlalchemy import exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises, assert_raises_message
+
+from sqlalchemy_monetdb import fake
+from sqlalchemy_monetdb.base import ConcurrencyConflictError, is_concurrency_conflict
+from sqlalchemy_monetdb.fake import Catalog
+from sqlalchemy_monetdb.retry import RetryStats, backoff_delay, run_transaction
+
+
+class FakeEngine(object):
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        self.attempts = 0
+
+    @contextlib.contextmanager
+    def begin(self):
+        self.attempts += 1
+        yield self
+        if self.conflicts:
+            self.conflicts -= 1
+            raise ConcurrencyConflictError(
+                "COMMIT", {}, Exception("transaction is aborted")
+            )
+
+
+class RetryTest(fixtures.TestBase):
+    def test_conflict_messages(self):
+        assert is_concurrency_conflict(
+            Exception(
+                "40000!COMMIT: transaction is aborted because of "
+                "concurrency conflicts, will ROLLBACK instead"
+            )
+        )
+        assert is_concurrency_conflict(
+            Exception("42000!INSERT INTO: transaction conflict detected")
+        )
+        assert not is_concurrency_conflict(
+            Exception("40002!INSERT INTO: PRIMARY KEY constraint violated")
+        )
+
+    def test_retry_until_success(self):
+        engine = FakeEngine(conflicts=2)
+        stats = RetryStats()
+        delays = []
+        result = run_transaction(
+            engine, lambda conn: "done", stats=stats, sleep=delays.append
+        )
+        eq_(result, "done")
+        eq_(engine.attempts, 3)
+        eq_(len(delays), 2)
+        eq_(stats.as_dict(), {"transactions": 1, "retries": 2, "exhausted": 0})
+
+    def test_retry_exhausted(self):
+        engine = FakeEngine(conflicts=5)
+        stats = RetryStats()
+        assert_raises(
+            ConcurrencyConflictError,
+            run_transaction,
+            engine,
+            lambda conn: None,
+            max_attempts=3,
+            stats=stats,
+            sleep=lambda delay: None,
+        )
+        eq_(engine.attempts, 3)
+        eq_(stats.as_dict(), {"transactions": 1, "retries": 2, "exhausted": 1})
+
+    def test_backoff_delay_bounds(self):
+        for attempt in range(1, 10):
+            delay = backoff_delay(attempt, base_delay=0.1, max_delay=1.0)
+            assert 0 <= delay <= min(1.0, 0.1 * 2 ** (attempt - 1))
+
+
+class ConflictTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+        self.conflicts = 0
+
+        def insert(parameters):
+            if self.conflicts:
+                self.conflicts -= 1
+                raise fake.OperationalError(
+                    "42000!INSERT INTO: transaction conflict detected"
+                )
+            return []
+
+        def violate(parameters):
+            raise fake.OperationalError(
+                "40002!INSERT INTO: PRIMARY KEY constraint 'other.other_pkey' violated"
+            )
+
+        self.catalog.script(r"^INSERT INTO counters", insert)
+        self.catalog.script(r"^INSERT INTO other", violate)
+
+    def _inserts(self):
+        return [
+            sql for sql, _ in self.catalog.executed if sql.startswith("INSERT INTO")
+        ]
+
+    def test_classify_error(self):
+        self.conflicts = 1
+        with self.engine.connect() as conn:
+            assert_raises_message(
+                ConcurrencyConflictError,
+                "transaction conflict detected",
+                conn.execute,
+                text("INSERT INTO counters VALUES (1)"),
+            )
+        with self.engine.connect() as conn:
+            err = assert_raises(
+                exc.OperationalError,
+                conn.execute,
+                text("INSERT INTO other VALUES (1)"),
+            )
+        assert not isinstance(err, ConcurrencyConflictError)
+
+    def test_retry(self):
+        self.conflicts = 2
+        stats = RetryStats()
+        delays = []
+        run_transaction(
+            self.engine,
+            lambda conn: conn.execute(text("INSERT INTO counters VALUES (1)")),
+            stats=stats,
+            sleep=delays.append,
+        )
+        eq_(self._inserts(), ["INSERT INTO counters VALUES (1)"] * 3)
+        eq_(len(delays), 2)
+        eq_(stats.as_dict(), {"transactions": 1, "retries": 2, "exhausted": 0})
+
+    def test_no_retry_of_other_errors(self):
+        stats = RetryStats()
+        assert_raises(
+            exc.OperationalError,
+            run_transaction,
+            self.engine,
+            lambda conn: conn.execute(text("INSERT INTO other VALUES (1)")),
+            stats=stats,
+            sleep=lambda delay: None,
+        )
+        eq_(self._inserts(), ["INSERT INTO other VALUES (1)"])
+        eq_(stats.as_dict(), {"transactions": 1, "retries": 0, "exhausted": 0})
@@ -0,0 +1,58 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy import exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises_message
+
+from sqlalchemy_monetdb.fake import Catalog
+
+
+class SavepointTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+
+    def _sent(self):
+        return [
+            sql
+            for sql, _ in self.catalog.executed
+            if "SAVEPOINT" in sql or sql.startswith("INSERT")
+        ]
+
+    def test_release(self):
+        with self.engine.begin() as conn:
+            with conn.begin_nested():
+                conn.execute(text("INSERT INTO t VALUES (1)"))
+        eq_(
+            self._sent(),
+            [
+                "SAVEPOINT sa_savepoint_1",
+                "INSERT INTO t VALUES (1)",
+                "RELEASE SAVEPOINT sa_savepoint_1",
+            ],
+        )
+
+    def test_rollback_to(self):
+        with self.engine.begin() as conn:
+            savepoint = conn.begin_nested()
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+            savepoint.rollback()
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+        eq_(
+            self._sent(),
+            [
+                "SAVEPOINT sa_savepoint_1",
+                "INSERT INTO t VALUES (1)",
+                "ROLLBACK TO SAVEPOINT sa_savepoint_1",
+                "INSERT INTO t VALUES (2)",
+            ],
+        )
+
+    def test_autocommit(self):
+        with self.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            assert_raises_message(
+                exc.InvalidRequestError,
+                "MonetDB does not support SAVEPOINT in autocommit mode",
+                conn.begin_nested,
+            )
+        eq_(self._sent(), [])
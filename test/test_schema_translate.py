@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, inspect, text
+from sqlalchemy.engine import default
+from sqlalchemy.schema import CreateSchema
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb.fake import Catalog
+
+metadata = MetaData()
+orders = Table("orders", metadata, Column("id", Integer), schema="tenant")
+
+
+class SchemaTranslateTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        for tenant in ("t1", "t2"):
+            self.catalog.add_table("orders", [("id", "int")], schema=tenant)
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+
+    def test_compiled_cache_shared_by_tenants(self):
+        stmt = orders.select().where(orders.c.id == 5)
+        with self.engine.connect() as conn:
+            hits = []
+            for tenant in ("t1", "t2", "t1"):
+                result = conn.execution_options(
+                    schema_translate_map={"tenant": tenant}
+                ).execute(stmt)
+                hits.append(result.context.cache_hit)
+        eq_(hits[1:], [default.CACHE_HIT, default.CACHE_HIT])
+        sent = [sql for sql, _ in self.catalog.executed if "orders" in sql]
+        eq_(
+            [sql.split("FROM ")[1].split()[0] for sql in sent],
+            ["t1.orders", "t2.orders", "t1.orders"],
+        )
+
+    def test_schema_ids_cached(self):
+        def schema_queries():
+            return sum(1 for sql, _ in self.catalog.executed if "FROM sys.schemas" in sql)
+
+        for _ in range(2):
+            eq_(inspect(self.engine).get_table_names(schema="t1"), ["orders"])
+        eq_(schema_queries(), 1)
+
+        with self.engine.begin() as conn:
+            conn.execute(CreateSchema("t3"))
+        inspect(self.engine).get_table_names(schema="t1")
+        eq_(schema_queries(), 2)
+
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA t3"))
+        inspect(self.engine).get_table_names(schema="t1")
+        eq_(schema_queries(), 3)
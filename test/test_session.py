@@ -0,0 +1,324 @@
+import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy import exc
+from sqlalchemy.testing import fixtures, eq_, assert_raises_message
+
+from sqlalchemy_monetdb.base import (
+    query_timeout_seconds,
+    render_time_zone,
+    time_zone_offset,
+)
+from sqlalchemy_monetdb import fake
+from sqlalchemy_monetdb.fake import Catalog
+from sqlalchemy_monetdb.session import (
+    set_autocommit,
+    set_optimizer,
+    set_role,
+    set_schema,
+    set_time_zone,
+)
+
+
+class SessionStateTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+
+    def _settings(self):
+        return [
+            sql
+            for sql, _ in self.catalog.executed
+            if sql.startswith(("SET ", "SELECT current_"))
+        ]
+
+    def test_schema_and_role(self):
+        with self.engine.connect() as conn:
+            tenant = {"monetdb_schema": "tenant 1", "monetdb_role": "app"}
+            for _ in range(3):
+                conn.execute(text("SELECT 1"), execution_options=tenant)
+            eq_(self.catalog.current_schema, "tenant 1")
+            conn.execute(text("SELECT 1"))
+        eq_(
+            self._settings(),
+            [
+                "SELECT current_schema",
+                'SET SCHEMA "tenant 1"',
+                "SELECT current_role",
+                "SET ROLE app",
+                "SET SCHEMA sys",
+                "SET ROLE monetdb",
+            ],
+        )
+
+    def test_time_zone(self):
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"), execution_options={"monetdb_time_zone": "+02:00"})
+            conn.execute(text("SELECT 1"), execution_options={"monetdb_time_zone": 7200})
+            eq_(self.catalog.time_zone, datetime.timedelta(hours=2))
+        # put back on checkin
+        eq_(self.catalog.time_zone, datetime.timedelta(0))
+        eq_(
+            self._settings(),
+            [
+                "SELECT current_timezone",
+                "SET TIME ZONE INTERVAL '+02:00' HOUR TO MINUTE",
+                "SET TIME ZONE INTERVAL '+00:00' HOUR TO MINUTE",
+            ],
+        )
+        eq_(render_time_zone(time_zone_offset("-03:30")), "INTERVAL '-03:30' HOUR TO MINUTE")
+        assert_raises_message(
+            exc.ArgumentError, "must look like", time_zone_offset, "UTC"
+        )
+
+    def test_textual_set(self):
+        with self.engine.connect() as conn:
+            tenant = {"monetdb_schema": "s1"}
+            conn.execute(text("SELECT 1"), execution_options=tenant)
+            conn.execute(text("SET SCHEMA s2"))
+            # s2 is now the schema statements go back to
+            conn.execute(text("SELECT 1"), execution_options=tenant)
+            conn.execute(text("SELECT 1"))
+            eq_(self.catalog.current_schema, "s2")
+        # checkin puts back the schema the session started with
+        eq_(self.catalog.current_schema, "sys")
+        eq_(
+            self._settings(),
+            [
+                "SELECT current_schema",
+                "SET SCHEMA s1",
+                "SET SCHEMA s2",
+                "SELECT current_schema",
+                "SET SCHEMA s1",
+                "SET SCHEMA s2",
+                "SET SCHEMA sys",
+            ],
+        )
+
+    def test_autocommit_unchanged(self):
+        calls = []
+        with self.engine.connect() as conn:
+            dbapi_connection = conn.connection.dbapi_connection
+            set_autocommit = dbapi_connection.set_autocommit
+            dbapi_connection.set_autocommit = lambda value: (
+                calls.append(value),
+                set_autocommit(value),
+            )
+            for _ in range(2):
+                conn.execution_options(isolation_level="AUTOCOMMIT")
+                conn.execution_options(isolation_level="SERIALIZABLE")
+            conn.execution_options(isolation_level="SERIALIZABLE")
+        eq_(calls, [True, False, True, False])
+
+    def test_checkin_restores_changed_settings(self):
+        tenant = {"monetdb_schema": "t1", "monetdb_role": "app"}
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"), execution_options=tenant)
+        eq_(self.catalog.current_schema, "sys")
+        eq_(self.catalog.role, "monetdb")
+        with self.engine.connect() as conn:
+            # back at the defaults already, checkin has nothing to do
+            conn.execute(text("SELECT 1"), execution_options=tenant)
+            conn.execute(text("SELECT 1"))
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        eq_(
+            self._settings(),
+            [
+                "SELECT current_schema",
+                "SET SCHEMA t1",
+                "SELECT current_role",
+                "SET ROLE app",
+                "SET SCHEMA sys",
+                "SET ROLE monetdb",
+                "SET SCHEMA t1",
+                "SET ROLE app",
+                "SET SCHEMA sys",
+                "SET ROLE monetdb",
+            ],
+        )
+        eq_(self.catalog.executed[-1][0], "SELECT 1")
+
+    def test_setters(self):
+        with self.engine.connect() as conn:
+            set_schema(conn, "t1")
+            set_role(conn, "app")
+            set_time_zone(conn, "-01:00")
+            set_optimizer(conn, "sequential_pipe")
+            # nothing is sent before a statement runs
+            eq_(self._settings(), [])
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 1"))
+            eq_(self.catalog.current_schema, "t1")
+            eq_(self.catalog.optimizer, "sequential_pipe")
+            conn.execute(text("SELECT 1"), execution_options={"monetdb_schema": "t2"})
+            conn.execute(text("SELECT 1"))
+            set_schema(conn, "t1")
+            conn.execute(text("SELECT 1"))
+        eq_(self.catalog.current_schema, "sys")
+        eq_(self.catalog.time_zone, datetime.timedelta(0))
+        eq_(
+            self._settings(),
+            [
+                "SET optimizer = 'sequential_pipe'",
+                "SELECT current_schema",
+                "SET SCHEMA t1",
+                "SELECT current_role",
+                "SET ROLE app",
+                "SELECT current_timezone",
+                "SET TIME ZONE INTERVAL '-01:00' HOUR TO MINUTE",
+                "SET SCHEMA t2",
+                "SET SCHEMA t1",
+                "SET optimizer = 'default_pipe'",
+                "SET SCHEMA sys",
+                "SET ROLE monetdb",
+                "SET TIME ZONE INTERVAL '+00:00' HOUR TO MINUTE",
+            ],
+        )
+
+    def test_setter_without_statement(self):
+        with self.engine.connect() as conn:
+            set_schema(conn, "t1")
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        eq_(self._settings(), [])
+        eq_(self.catalog.current_schema, "sys")
+
+    def test_set_autocommit(self):
+        with self.engine.connect() as conn:
+            set_autocommit(conn, True)
+            eq_(conn.get_isolation_level(), "AUTOCOMMIT")
+            set_autocommit(conn, False)
+            eq_(conn.get_isolation_level(), "SERIALIZABLE")
+
+
+class QueryTimeoutTest(fixtures.TestBase):
+    def setup_test(self):
+        self.catalog = Catalog()
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+
+    def _calls(self):
+        return [
+            sql
+            for sql, _ in self.catalog.executed
+            if "querytimeout" in sql
+        ]
+
+    def test_timeout(self):
+        with self.engine.connect() as conn:
+            for timeout in (5, 5, None, 0.5, 1):
+                conn.execute(
+                    text("SELECT 1"),
+                    execution_options={"monetdb_query_timeout": timeout},
+                )
+            eq_(self.catalog.query_timeout, 1)
+        eq_(
+            self._calls(),
+            [
+                "SELECT querytimeout FROM sys.sessions "
+                "WHERE sessionid = sys.current_sessionid()",
+                "CALL sys.setquerytimeout(5)",
+                # put back before the statement without a timeout
+                "CALL sys.setquerytimeout(0)",
+                "CALL sys.setquerytimeout(1)",
+                # and on checkin
+                "CALL sys.setquerytimeout(0)",
+            ],
+        )
+        eq_(self.catalog.query_timeout, 0)
+
+    def test_restore_after_error(self):
+        def abort(parameters):
+            raise fake.OperationalError("Query aborted due to timeout")
+
+        self.catalog.query_timeout = 30
+        self.catalog.script(r"FROM slow", abort)
+        with self.engine.connect() as conn:
+            assert_raises_message(
+                exc.OperationalError,
+                "aborted due to timeout",
+                conn.execute,
+                text("SELECT * FROM slow"),
+                execution_options={"monetdb_query_timeout": 2},
+            )
+            eq_(self.catalog.query_timeout, 2)
+        eq_(self.catalog.query_timeout, 30)
+
+    def test_seconds(self):
+        eq_(query_timeout_seconds(None), None)
+        eq_(query_timeout_seconds(0), 0)
+        eq_(query_timeout_seconds(0.5), 1)
+        eq_(query_timeout_seconds(2.0), 2)
+        for value in (-1, "5", True):
+            assert_raises_message(
+                exc.ArgumentError,
+                "non-negative number of seconds",
+                query_timeout_seconds,
+                value,
+            )
+
+    def test_invalid_option(self):
+        with self.engine.connect() as conn:
+            assert_raises_message(
+                exc.ArgumentError,
+                "non-negative number of seconds",
+                conn.execute,
+                text("SELECT 1"),
+                execution_options={"monetdb_query_timeout": -5},
+            )
+        eq_(self._calls(), [])
+
+
+class OptimizerTest(fixtures.TestBase):
+    def _connect(self, url, **kw):
+        catalog = Catalog()
+        engine = create_engine(url, catalog=catalog, **kw)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return catalog
+
+    def test_url(self):
+        catalog = self._connect("monetdb+fake://?optimizer=sequential_pipe")
+        assert "SET optimizer = 'sequential_pipe'" in [
+            sql for sql, _ in catalog.executed
+        ]
+        eq_(catalog.optimizer, "sequential_pipe")
+
+    def test_argument(self):
+        catalog = self._connect("monetdb+fake://", optimizer="no_mitosis_pipe")
+        eq_(catalog.optimizer, "no_mitosis_pipe")
+        # the URL wins over the argument
+        catalog = self._connect(
+            "monetdb+fake://?optimizer=minimal_pipe", optimizer="no_mitosis_pipe"
+        )
+        eq_(catalog.optimizer, "minimal_pipe")
+        eq_(
+            [sql for sql, _ in catalog.executed if sql.startswith("SET optimizer")],
+            ["SET optimizer = 'minimal_pipe'"],
+        )
+
+    def test_default(self):
+        catalog = self._connect("monetdb+fake://")
+        assert not any(sql.startswith("SET") for sql, _ in catalog.executed)
+
+    def test_execution_option(self):
+        catalog = Catalog()
+        engine = create_engine(
+            "monetdb+fake://?optimizer=sequential_pipe", catalog=catalog
+        )
+        with engine.connect() as conn:
+            conn.execute(
+                text("SELECT 1"), execution_options={"monetdb_optimizer": "it's"}
+            )
+            eq_(catalog.optimizer, "it's")
+        # back to the one set at connect time on checkin
+        eq_(catalog.optimizer, "sequential_pipe")
+        eq_(
+            [sql for sql, _ in catalog.executed if "optimizer" in sql],
+            [
+                "SET optimizer = 'sequential_pipe'",
+                "SELECT optimizer",
+                "SET optimizer = 'it''s'",
+                "SET optimizer = 'sequential_pipe'",
+            ],
+        )
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.testing import fixtures, eq_
+
+from sqlalchemy_monetdb import fake
+from sqlalchemy_monetdb.fake import Catalog
+from sqlalchemy_monetdb.slowlog import SlowQueryLog
+
+
+class SlowQueryLogTest(fixtures.TestBase):
+    def setup_test(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "slow.jsonl")
+        self.catalog = Catalog()
+        self.catalog.script(
+            r"^\s*SELECT name FROM users", [("alice",)], columns=("name",)
+        )
+        self.catalog.script(
+            r"FROM sys\.tracelog\(\)",
+            [(12, "X_1 := sql.mvc();"), (340, "X_5 := algebra.select(X_4);")],
+            columns=("ticks", "stmt"),
+        )
+        self.engine = create_engine("monetdb+fake://", catalog=self.catalog)
+
+    def teardown_test(self):
+        shutil.rmtree(self.directory)
+
+    def _log(self, **kw):
+        slow_log = SlowQueryLog(self.path, **kw)
+        slow_log.install(self.engine)
+        return slow_log
+
+    def _entries(self, slow_log, prefix=""):
+        slow_log.close()
+        with open(self.path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        return [e for e in entries if e["statement"].startswith(prefix)]
+
+    def _traced(self):
+        return [sql for sql, _ in self.catalog.executed if sql.startswith("TRACE")]
+
+    def test_threshold(self):
+        slow_log = self._log(threshold=3600)
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT name FROM users"))
+        slow_log.remove(self.engine)
+        eq_(self._entries(slow_log), [])
+
+    def test_entry(self):
+        slow_log = self._log(threshold=0)
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT name FROM users WHERE id = :id"), {"id": 7})
+        (entry,) = self._entries(slow_log, "SELECT name")
+        eq_(entry["parameters"], {"id": 7})
+        eq_(entry["rowcount"], 1)
+        eq_(entry["executemany"], False)
+        assert entry["duration_ms"] >= 0
+        assert "trace" not in entry
+        eq_(self._traced(), [])
+
+    def test_redact(self):
+        slow_log = self._log(threshold=0, redact=True)
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT name FROM users WHERE id = :id"), {"id": 7})
+        (entry,) = self._entries(slow_log, "SELECT name")
+        eq_(entry["parameters"], {"id": "int"})
+
+    def test_trace_select(self):
+        connects = []
+        event.listen(self.engine, "connect", lambda *arg: connects.append(arg))
+        slow_log = self._log(threshold=0, trace=True)
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT name FROM users WHERE id = :id"), {"id": 7})
+        (entry,) = self._entries(slow_log, "SELECT name")
+        eq_(
+            entry["trace"],
+            [
+                {"usec": 12, "statement": "X_1 := sql.mvc();"},
+                {"usec": 340, "statement": "X_5 := algebra.select(X_4);"},
+            ],
+        )
+        eq_(self._traced(), ["TRACE SELECT name FROM users WHERE id = :id"])
+        # traced on a connection of its own
+        eq_(len(connects), 2)
+
+    def test_trace_session_settings(self):
+        self.catalog.add_schema("tenant")
+        slow_log = self._log(threshold=0, trace=True)
+        with self.engine.connect() as conn:
+            conn.execute(
+                text("SELECT name FROM users"),
+                execution_options={"monetdb_schema": "tenant"},
+            )
+        slow_log.close()
+        sent = [sql for sql, _ in self.catalog.executed]
+        traced = sent.index("TRACE SELECT name FROM users")
+        eq_(sent[traced - 1], "SET SCHEMA tenant")
+
+    def test_trace_skips_writes(self):
+        slow_log = self._log(threshold=0, trace=True)
+        with self.engine.begin() as conn:
+            conn.execute(text("INSERT INTO users (name) VALUES (:name)"), {"name": "x"})
+            conn.execute(
+                text("INSERT INTO users (name) VALUES (:name)"),
+                [{"name": "y"}, {"name": "z"}],
+            )
+            conn.execute(text("UPDATE users SET name = 'w'"))
+        entries = self._entries(slow_log, ("INSERT", "UPDATE"))
+        eq_(len(entries), 3)
+        assert not any("trace" in e for e in entries)
+        eq_(self._traced(), [])
+
+    def test_trace_error(self):
+        def fail(parameters):
+            raise fake.OperationalError("TRACE not allowed")
+
+        self.catalog.script(r"^TRACE ", fail)
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger = logging.getLogger("sqlalchemy_monetdb.slowlog")
+        logger.addHandler(handler)
+        try:
+            slow_log = self._log(threshold=0, trace=True)
+            with self.engine.begin() as conn:
+                eq_(conn.execute(text("SELECT name FROM users")).all(), [("alice",)])
+                # the transaction of the application is not affected
+                eq_(conn.execute(text("SELECT name FROM users")).all(), [("alice",)])
+        finally:
+            logger.removeHandler(handler)
+        entries = self._entries(slow_log, "SELECT name")
+        eq_(len(entries), 2)
+        assert not any("trace" in e for e in entries)
+        eq_(len(records), 2)
+        eq_(str(records[0].exc_info[1]), "TRACE not allowed")